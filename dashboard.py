@@ -5,6 +5,10 @@ import plotly.graph_objects as go
 from streamlit_echarts import st_echarts
 import json
 
+import os
+
+from src.investor_store import firm_investment, load_investors
+
 # Set page config with custom theme
 import streamlit as st
 import pandas as pd
@@ -94,11 +98,12 @@ def display_compact_person_card(person):
             <div class="small-text">🏢 {person['current firm name']}</div>
             """, unsafe_allow_html=True)
             
-            if isinstance(person['firm investment'], dict):
+            investment = firm_investment(person)
+            if investment:
                 with st.expander("Investment Details"):
                     st.markdown(f"""
-                    <div class="small-text">🎯 {person['firm investment']['investment_stages']}</div>
-                    <div class="small-text">💼 {person['firm investment']['investment_verticals']}</div>
+                    <div class="small-text">🎯 {investment.get('investment_stages', '')}</div>
+                    <div class="small-text">💼 {investment.get('investment_verticals', '')}</div>
                     """, unsafe_allow_html=True)
         
         with col2:
@@ -218,10 +223,11 @@ def generate_mock_companies(num_companies=5):
     
     return companies
 
-def generate_mock_users(num_users=5, personas_list=None):
+def generate_mock_users(num_users=5, personas_list=None, investors=None):
+    """Mock persona matches on top of real investors when given, else on made-up ones"""
     users = []
     
-    for i in range(num_users):
+    for i in range(len(investors) if investors else num_users):
         # Generate random similarity scores that sum to 100
         raw_scores = [random.randint(1, 100) for _ in range(len(personas_list))]
         total = sum(raw_scores)
@@ -257,6 +263,8 @@ def generate_mock_users(num_users=5, personas_list=None):
             },
             "persona_matches": persona_matches
         }
+        if investors:
+            user = dict(investors[i], persona_matches=persona_matches)
         users.append(user)
     
     return users
@@ -264,7 +272,10 @@ def generate_mock_users(num_users=5, personas_list=None):
 # Generate all mock data
 mock_personas = generate_mock_personas()
 mock_companies = generate_mock_companies()
-mock_users = generate_mock_users(num_users=5, personas_list=mock_personas)
+# Real investors from the columnar store when the sheet is around
+INVESTORS_PATH = "sheet1.csv"
+investors = load_investors(INVESTORS_PATH).to_dicts()[:5] if os.path.exists(INVESTORS_PATH) else None
+mock_users = generate_mock_users(num_users=5, personas_list=mock_personas, investors=investors)
 
 
 # Run the app
@@ -11,7 +11,15 @@ for row in csv.reader(open(".env"),delimiter='='):
         envs[row[0]]=row[1]
 
 api_key=envs["JAMBA_KEY"]
-client = JambaAIApi(api_key=api_key)
+
+
+@st.cache_resource
+def jamba_client(api_key):
+    """One client per key for the whole server instead of one per rerun"""
+    return JambaAIApi(api_key=api_key)
+
+
+client = jamba_client(api_key)
 
 st.title("Jamba Chat")
 
@@ -36,10 +44,14 @@ if user_input := st.chat_input("Type your message"):
 
     messages = [{"role": "user", "content": "translate user's message to spanish. Limit the response to 30 words maximum. Message:"+user_input}]
 
-    answer = client.get_completion(messages)
+    # Display the assistant's response as it streams in
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+        answer = ""
+        for chunk in client.stream_completion(messages):
+            answer += chunk
+            placeholder.markdown(html.unescape(answer) + "▌")
+        placeholder.markdown(html.unescape(answer))
+
     # Add the assistant's response to the chat history
     st.session_state.messages.append({"role": "assistant", "content": answer})
-
-    # Display the assistant's response
-    with st.chat_message("assistant"):
-        st.markdown(html.unescape(answer))
@@ -3,29 +3,78 @@ import os
 import streamlit as st
 
 from src.pdl_api import enrich_profiles
-from src.hypothesis_generator import generate_hypothesis
-from src.openai_api import OpenAIApi
-from src.prompts import hypotheis_update_prompt
-from src.utils import parse_llm_response
+from src.hypothesis_generator import generate_hypothesis, stream_personas, update_messages
 from src.deck_generation import process_multiple_jsons
+from similarity import IncrementalMatcher
+from src.process_investor_list import persona_hypothesis, stream_persons
+from src.run_journal import new_run_id
+from src.investor_store import load_investors
 # from src.process_investor_list import get_aldo_data
 # from streamlit_card import card
 import streamlit.components.v1 as components
 
 import pandas as pd
 
-st.session_state.df = pd.read_csv('dev_tools_investors_preseed.xlsx - Sheet1.csv')
+# Parsed once into the columnar investor store; reruns reuse it until the CSV changes
+LEADS_PATH = 'dev_tools_investors_preseed.xlsx - Sheet1.csv'
+st.session_state.leads = load_investors(LEADS_PATH).to_dicts()
+st.session_state.df = pd.DataFrame(st.session_state.leads)
 
 if os.getenv("OPENAI_API_KEY"):
     print("OPENAI_API_KEY is set")
 else:
     print("OPENAI_API_KEY is not set")
-openai_api = OpenAIApi(os.getenv("OPENAI_API_KEY"))
+
+# Leads sampled for live LLM ranking when processing starts
+LIVE_SCORING_LEADS = 50
+# Model that rewrites the personas from the hypothesis chat
+CHAT_UPDATE_MODEL = "gpt-4-0125-preview"
+
+
+def update_persona_matches():
+    """Re-match the lead list to the current personas, only recomputing personas that changed"""
+    if 'matcher' not in st.session_state:
+        st.session_state.matcher = IncrementalMatcher(st.session_state.leads)
+    st.session_state.persona_matches = st.session_state.matcher.update_personas(st.session_state.hypothesis)
+    print(f"Re-matched {st.session_state.matcher.last_recomputed} of {len(st.session_state.hypothesis)} personas")
+
+
+PERSONA_FIELDS = [
+    ("Name", "persona_name"),
+    ("Demographics", "demographics"),
+    ("Psychographics", "psychographics"),
+    ("Pain Points", "pain_points"),
+    ("Needs", "needs"),
+    ("How the Company Addresses These Needs", "how_company_addresses_needs"),
+    ("Preferred Communication Channels", "preferred_communication_channels"),
+    ("Preferred Device Type", "preferred_device_type"),
+    ("Trigger Events", "trigger_events"),
+    ("Purchasing Behavior and Decision-Making Process", "purchasing_behavior"),
+    ("Potential Objections to Overcome", "potential_objections"),
+    ("Influences and Motivators", "influences_and_motivators"),
+    ("Goals and Aspirations", "goals_and_aspirations"),
+    ("Pitch", "pitch"),
+]
+
+
+def show_persona(number, person):
+    """Expander with one persona's fields; missing fields show blank"""
+    with st.expander(f"Persona {number}"):
+        for label, key in PERSONA_FIELDS:
+            st.write(f"{label}:", person.get(key, ""))
+
+
+def leaderboard_frame(top):
+    """[(lead, mean_score)] from a Leaderboard -> table with the score first"""
+    return pd.DataFrame([{"score": round(score, 2), **{k: v for k, v in lead.items() if k != "id"}} for lead, score in top])
 
 st.set_page_config(layout="wide")
 
 st.header("CAIRO: Validate market hypotheses in minutes")
 
+# Persona generation and chat updates reuse cached responses for identical requests unless this is on
+force_regenerate = st.sidebar.checkbox("Force regenerate", help="Ignore cached model responses and call the model again")
+
 
 st.markdown(
             (
@@ -136,7 +185,25 @@ with st.form("Get Company Information"):
         
         with st.spinner("Generating Hypotheses..."):
             print("Generating Hypotheses...")
-            hypothesis = generate_hypothesis(form_data_json)
+            # Show each persona as soon as it is parsed; cleared once the full list is rendered below
+            live_personas = st.empty()
+            live_box = live_personas.container()
+            streamed = []
+
+            def on_persona(person):
+                streamed.append(person)
+                with live_box:
+                    show_persona(len(streamed), person)
+
+            def on_restart():
+                # The request being shown failed; its personas are replaced by the surviving one's
+                global live_box
+                streamed.clear()
+                live_box = live_personas.container()
+
+            hypothesis = generate_hypothesis(form_data_json, on_persona=on_persona, force=force_regenerate,
+                                             on_restart=on_restart)
+            live_personas.empty()
             print("Hypothesis Generated")
 
         if hypothesis is None:
@@ -144,6 +211,8 @@ with st.form("Get Company Information"):
 
         if 'hypothesis' not in st.session_state:
             st.session_state.hypothesis = hypothesis
+            if hypothesis is not None:
+                update_persona_matches()
         
         if 'conversation' not in st.session_state:
             st.session_state.conversation = []
@@ -152,25 +221,8 @@ if 'hypothesis' in st.session_state:
     # commenting because its same as the below list of the personas
     # st.write("Hypothesis:", st.session_state.hypothesis)
     # TODO: Better UI Display of Hypothesis
-    i = 1
-    for person in st.session_state.hypothesis:
-        contain_person = st.expander(f"Persona {i}")
-        with contain_person:
-            st.write("Name:", person["persona_name"])
-            st.write("Demographics:", person["demographics"])
-            st.write("Psychographics:", person["psychographics"])
-            st.write("Pain Points:", person["pain_points"])
-            st.write("Needs:", person["needs"])
-            st.write("How the Company Addresses These Needs:", person["how_company_addresses_needs"])
-            st.write("Preferred Communication Channels:", person["preferred_communication_channels"])
-            st.write("Preferred Device Type:", person["preferred_device_type"])
-            st.write("Trigger Events:", person["trigger_events"])
-            st.write("Purchasing Behavior and Decision-Making Process:", person["purchasing_behavior"])
-            st.write("Potential Objections to Overcome:", person["potential_objections"])
-            st.write("Influences and Motivators:", person["influences_and_motivators"])
-            st.write("Goals and Aspirations:", person["goals_and_aspirations"])
-            st.write("Pitch:", person["pitch"])
-            i += 1
+    for i, person in enumerate(st.session_state.hypothesis, 1):
+        show_persona(i, person)
                 
     st.subheader("Confirm the Hypothesis")
 
@@ -189,17 +241,17 @@ if 'hypothesis' in st.session_state:
         # Generate LLM response
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
-            input_prompt = hypotheis_update_prompt.format(
-                company_details=st.session_state.conversation,
-                hypotheses=st.session_state.hypothesis,
-                conversation_history=json.dumps(st.session_state.conversation),
-                user_input=user_input
-            )
-            messages = [{"role": "user", "content": input_prompt}]
-            full_response = openai_api.get_completion(messages)
-            new_hypothesis = parse_llm_response(full_response)
+            messages = update_messages(st.session_state.get("form_data", {}), st.session_state.hypothesis,
+                                       st.session_state.conversation, user_input)
+            # Show the rewrite as it is generated instead of an empty box until it finishes
+            parser = stream_personas(messages, on_text=lambda text: message_placeholder.markdown(text + "▌"),
+                                     model=CHAT_UPDATE_MODEL, force=force_regenerate)
+            full_response = parser.text
+            new_hypothesis = parser.result()
             message_placeholder.code(new_hypothesis, language="json")
             st.session_state.hypothesis = new_hypothesis
+            if new_hypothesis is not None:
+                update_persona_matches()
 
         
         # Add assistant response to conversation
@@ -223,6 +275,7 @@ if 'hypothesis' in st.session_state:
         deck_links = process_multiple_jsons(hypothesis)
         # st.write(deck_links)
 
+        lead_tables = []
         for i, (hypotheses_, deck_link) in enumerate(zip(hypothesis, deck_links)):
             hypo_dict = {k:v for k, v in hypotheses_.items() if k in ["hypothesis", "pain_point", "pitch"]}
             st.markdown(f"### Persona {i+1}")
@@ -231,6 +284,30 @@ if 'hypothesis' in st.session_state:
                     st.markdown(f"**{key}**: {value}")
                 st.markdown(f"**Deck Link**: {deck_link[1]}")
                 components.iframe(deck_link[1], height=500, scrolling=True)
-                st.dataframe(st.session_state.df.sample(5))
+                # Embedding matches until the LLM ranking below replaces them
+                lead_table = st.empty()
+                if 'persona_matches' in st.session_state:
+                    top_leads = st.session_state.persona_matches.scores[:, i].argsort()[::-1][:5]
+                    lead_table.dataframe(st.session_state.df.iloc[top_leads])
+                else:
+                    lead_table.dataframe(st.session_state.df.sample(5))
+                lead_tables.append(lead_table)
+
+        # Rank leads with the LLM, refreshing each persona's table as scores arrive
+        scoring_hypotheses = [persona_hypothesis(person) for person in hypothesis]
+        leads = st.session_state.leads
+        total = min(LIVE_SCORING_LEADS, len(leads)) * len(scoring_hypotheses)
+        progress = st.progress(0.0, text="Ranking leads...")
+        # One journaled run per persona set, kept across reruns: starting again after an
+        # interruption resumes it instead of paying for the finished pairs twice
+        run_key = json.dumps(scoring_hypotheses, sort_keys=True)
+        if st.session_state.get("scoring_run_key") != run_key:
+            st.session_state.scoring_run_key = run_key
+            st.session_state.scoring_run_id = new_run_id()
+        stream = stream_persons(leads, scoring_hypotheses, top_n=5, num_investors=LIVE_SCORING_LEADS,
+                                run_id=st.session_state.scoring_run_id)
+        for done, (_, hyp, _, leaderboard) in enumerate(stream, 1):
+            lead_tables[hyp['hyp_id']].dataframe(leaderboard_frame(leaderboard.top(hyp['hyp_id'])))
+            progress.progress(done / total, text=f"Ranked {done} of {total} lead/persona pairs")
 
 
@@ -0,0 +1,78 @@
+import argparse
+import time
+
+import numpy as np
+
+from src.quantization import DTYPES, ScalarQuantizer
+
+
+def normalize(vectors):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def synthetic_corpus(n, dim=384, n_clusters=200, seed=0):
+    """Clustered unit vectors shaped roughly like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    corpus = centers[rng.integers(0, n_clusters, n)] + rng.normal(scale=0.6, size=(n, dim)).astype(np.float32)
+    return normalize(corpus).astype(np.float32)
+
+
+def synthetic_queries(corpus, n_queries=100, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.choice(len(corpus), n_queries, replace=False)]
+    return normalize(picks + rng.normal(scale=0.05, size=picks.shape).astype(np.float32)).astype(np.float32)
+
+
+def benchmark(name, corpus, queries, k=10):
+    """Print memory, latency, recall@k and ranking drift of every dtype against float32"""
+    base_ids, base_scores = ScalarQuantizer('float32').top_k(corpus, queries, k)
+
+    print(f"\n{name}: {len(corpus)} x {corpus.shape[1]} embeddings, {len(queries)} queries, k={k}")
+    print(f"{'dtype':>8} {'MB':>9} {'saved':>7} {'ms/query':>9} {'recall@k':>9} {'top1':>6} {'rank drift':>11} {'score err':>10}")
+    for dtype in DTYPES:
+        quantizer = ScalarQuantizer(dtype).fit(corpus)
+        codes = quantizer.encode(corpus)
+
+        start = time.perf_counter()
+        ids, _ = quantizer.top_k(codes, queries, k)
+        ms_per_query = (time.perf_counter() - start) * 1000 / len(queries)
+
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(ids, base_ids)])
+        top1 = np.mean(ids[:, 0] == base_ids[:, 0])
+        # Mean |position change| of the baseline top-k items that survived
+        drift = np.mean([
+            np.mean([abs(list(b).index(i) - pos) for pos, i in enumerate(a) if i in b] or [k])
+            for a, b in zip(ids, base_ids)
+        ])
+        # Error of the quantized score on the baseline's own top-k
+        approx = quantizer.score(codes[base_ids.ravel()], queries).reshape(len(queries), k, len(queries))
+        approx = approx[np.arange(len(queries)), :, np.arange(len(queries))]
+        score_err = np.mean(np.abs(approx - base_scores))
+
+        saved = 1 - codes.nbytes / corpus.nbytes
+        print(f"{dtype:>8} {codes.nbytes / 2**20:>9.1f} {saved:>7.0%} {ms_per_query:>9.2f} {recall:>9.3f} {top1:>6.2f} {drift:>11.3f} {score_err:>10.5f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory and recall of float16/int8 embedding storage vs float32")
+    parser.add_argument("--csv", default="sheet1.csv", help="Investor CSV to embed (empty string to skip)")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma separated synthetic corpus sizes")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        from similarity import EXAMPLE_PERSONAS, csv_to_json, encode_texts, flatten_persona, flatten_user
+
+        corpus = normalize(np.asarray(encode_texts([flatten_user(u) for u in csv_to_json(args.csv)]), dtype=np.float32))
+        queries = normalize(np.asarray(encode_texts([flatten_persona(p) for p in EXAMPLE_PERSONAS]), dtype=np.float32))
+        benchmark(args.csv, corpus, queries, args.k)
+
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        corpus = synthetic_corpus(size)
+        benchmark(f"synthetic-{size}", corpus, synthetic_queries(corpus, min(args.queries, size)), args.k)
+
+
+if __name__ == "__main__":
+    main()
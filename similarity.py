@@ -1,9 +1,102 @@
-from sentence_transformers import SentenceTransformer
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+import argparse
+import atexit
+import csv
+import itertools
 import json
+import os
+import threading
+
+import numpy as np
+
+from src.ann_index import IVFIndex
+from src.embedding_cache import EmbeddingCache, text_key
+from src.investor_store import firm_investment, load_investors
+from src.sharded_encoder import ShardedEncoder
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_CACHE_DIR = '.embedding_cache'
+INVESTOR_INDEX_PATH = 'investor_index.npz'
+
+# Investor fields that get their own embedding, and the persona text each one is compared with
+FIELD_NAMES = ('description', 'firm_description', 'investment_stages', 'investment_verticals', 'location')
+DEFAULT_FIELD_WEIGHTS = {
+    'description': 2.0,
+    'firm_description': 1.0,
+    'investment_stages': 1.0,
+    'investment_verticals': 1.5,
+    'location': 0.5,
+}
+
+_models = {}
+_caches = {}
+_sharded_encoders = {}
+_indexes = {}  # path -> (mtime, IVFIndex)
+_model_lock = threading.Lock()
+
+
+def get_model(model_name=MODEL_NAME):
+    """Return the process-wide SentenceTransformer, loading it on first use"""
+    model = _models.get(model_name)
+    if model is None:
+        with _model_lock:
+            model = _models.get(model_name)
+            if model is None:
+                # Imported here so that importing this module stays cheap
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name)
+                _models[model_name] = model
+    return model
+
+
+def warm_up(model_name=MODEL_NAME):
+    """Load the model and run one dummy encode so the first real call is fast"""
+    get_model(model_name).encode(["warm up"], convert_to_numpy=True)
 
 
+def get_investor_index(path=INVESTOR_INDEX_PATH):
+    """Return the process-wide IVF index saved at path, reloading it only when the file changes"""
+    mtime = os.path.getmtime(path)
+    with _model_lock:
+        cached = _indexes.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, IVFIndex.load(path))
+            _indexes[path] = cached
+        return cached[1]
+
+
+def get_cache(cache_dir=EMBEDDING_CACHE_DIR, model_name=MODEL_NAME):
+    """Return the process-wide embedding cache for a directory and model"""
+    key = (cache_dir, model_name)
+    with _model_lock:
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(cache_dir, model_name)
+        return _caches[key]
+
+
+def get_sharded_encoder(workers, model_name=MODEL_NAME):
+    """Return the process-wide worker pool encoder for a worker count and model"""
+    key = (model_name, workers)
+    with _model_lock:
+        if key not in _sharded_encoders:
+            _sharded_encoders[key] = ShardedEncoder(model_name, workers)
+            atexit.register(_sharded_encoders[key].close)
+        return _sharded_encoders[key]
+
+
+def encode_texts(texts, model_name=MODEL_NAME, batch_size=32, cache_dir=EMBEDDING_CACHE_DIR, workers=1):
+    """Encode texts with the shared model, going through the embedding cache when cache_dir is set.
+
+    workers > 1 splits the texts over a pool of CPU processes (see ShardedEncoder).
+    """
+    def encode(batch):
+        if workers > 1:
+            return get_sharded_encoder(workers, model_name).encode(batch, batch_size=batch_size)
+        return get_model(model_name).encode(batch, batch_size=batch_size, convert_to_numpy=True)
+
+    if cache_dir is None:
+        return encode(list(texts)) if texts else np.empty((0, 0), dtype=np.float32)
+    return get_cache(cache_dir, model_name).get_or_encode(list(texts), encode)
+
 
 def flatten_persona(persona):
     """Convert nested persona dictionary into a flat text representation"""
@@ -12,16 +105,22 @@ def flatten_persona(persona):
     # Add persona name
     text_parts.append(persona['persona_name'])
     
-    # Add demographics
+    # Add demographics (edited personas from the chat sometimes hold plain strings here)
     demo = persona['demographics']
-    text_parts.append(f"Age {demo['age']} {demo['gender']} {demo['location']} {demo['education']} {demo['occupation']}")
+    if isinstance(demo, dict):
+        text_parts.append(f"Age {demo['age']} {demo['gender']} {demo['location']} {demo['education']} {demo['occupation']}")
+    else:
+        text_parts.append(str(demo))
     
     # Add psychographics
     psycho = persona['psychographics']
-    text_parts.append(f"Interests: {' '.join(psycho['interests'])}")
-    text_parts.append(f"Values: {' '.join(psycho['values'])}")
-    text_parts.append(psycho['lifestyle'])
-    text_parts.append(psycho['attitudes'])
+    if isinstance(psycho, dict):
+        text_parts.append(f"Interests: {' '.join(psycho['interests'])}")
+        text_parts.append(f"Values: {' '.join(psycho['values'])}")
+        text_parts.append(psycho['lifestyle'])
+        text_parts.append(psycho['attitudes'])
+    else:
+        text_parts.append(str(psycho))
     
     # Add other important fields
     important_fields = [
@@ -59,9 +158,9 @@ def flatten_user(user):
     if 'firm description' in user:
         text_parts.append(str(user['firm description']))
     
-    # Handle investment information which is a dictionary
-    if 'firm investment' in user and isinstance(user['firm investment'], dict):
-        investment_info = user['firm investment']
+    # Handle investment information, a dictionary (or its Python repr in raw rows)
+    investment_info = firm_investment(user)
+    if investment_info:
         if 'investment_stages' in investment_info:
             text_parts.append(str(investment_info['investment_stages']))
         if 'investment_verticals' in investment_info:
@@ -76,68 +175,296 @@ def flatten_user(user):
     
     # Create context from investment focus
     investment_context = "Focuses on investments in technology, "
-    if 'firm investment' in user and isinstance(user['firm investment'], dict):
-        if 'investment_verticals' in user['firm investment']:
-            investment_context += user['firm investment']['investment_verticals']
-        if 'investment_stages' in user['firm investment']:
-            investment_context += f" at {user['firm investment']['investment_stages']} stages"
+    if investment_info:
+        if 'investment_verticals' in investment_info:
+            investment_context += investment_info['investment_verticals']
+        if 'investment_stages' in investment_info:
+            investment_context += f" at {investment_info['investment_stages']} stages"
     text_parts.append(investment_context)
     
     return ' '.join(text_parts)
 
-def process_users_and_personas(users_list, personas_list, batch_size=32):
-    """Process users and personas with batching for better performance"""
-    # Initialize the model
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    
-    # Create embeddings for personas
+def user_field_texts(user):
+    """Per-field texts of an investor, keyed by FIELD_NAMES ('' when missing)"""
+    investment = firm_investment(user)
+    return {
+        'description': str(user.get('description') or ''),
+        'firm_description': ' '.join(str(user.get(f) or '') for f in ('current firm name', 'firm description')).strip(),
+        'investment_stages': str(investment.get('investment_stages') or ''),
+        'investment_verticals': str(investment.get('investment_verticals') or ''),
+        'location': str(user.get('current location') or ''),
+    }
+
+
+def persona_field_texts(persona):
+    """Persona texts matched against each investor field in FIELD_NAMES"""
+    demo = persona.get('demographics') or {}
+    psycho = persona.get('psychographics') or {}
+    if not isinstance(demo, dict):
+        demo = {'occupation': demo}
+    if not isinstance(psycho, dict):
+        psycho = {'interests': [psycho]}
+
+    def join(*parts):
+        return ' '.join(' '.join(map(str, p)) if isinstance(p, list) else str(p) for p in parts if p).strip()
+
+    return {
+        'description': join(persona.get('persona_name'), demo.get('occupation'), demo.get('education'),
+                            persona.get('goals_and_aspirations')),
+        'firm_description': join(persona.get('pain_points'), persona.get('needs'), persona.get('how_company_addresses_needs')),
+        'investment_stages': join(persona.get('trigger_events'), persona.get('purchasing_behavior')),
+        'investment_verticals': join(psycho.get('interests'), psycho.get('values'), persona.get('influences_and_motivators')),
+        'location': join(demo.get('location')),
+    }
+
+
+class PersonaMatches:
+    """Dense investors x personas match percentages.
+
+    scores[i, k] is the share (in %) of user_index[i]'s similarity that goes to
+    persona k. Per-user dicts are only built when to_dicts()/attach() is called.
+    """
+
+    def __init__(self, scores, persona_names, user_index=None, user_names=None):
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.persona_names = list(persona_names)
+        self.user_index = np.arange(len(self.scores), dtype=np.int64) if user_index is None else np.asarray(user_index, dtype=np.int64)
+        self.user_names = user_names
+        self.persona_index = np.arange(len(self.persona_names), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def best_persona(self):
+        """Index of the best matching persona for every user"""
+        return self.scores.argmax(axis=1)
+
+    def to_dicts(self):
+        """Legacy per-user {'persona_name': {'similarity_percentage': ...}} dicts"""
+        rounded = np.round(self.scores.astype(np.float64), 2).tolist()
+        return [
+            {name: {'similarity_percentage': value} for name, value in zip(self.persona_names, row)}
+            for row in rounded
+        ]
+
+    def attach(self, users_list):
+        """Store the match dicts on the user objects under 'persona_matches'"""
+        for row, matches in zip(self.user_index, self.to_dicts()):
+            users_list[row]['persona_matches'] = matches
+        return users_list
+
+    def save(self, path):
+        """Write the matrix and index arrays as a compressed columnar .npz file"""
+        arrays = {
+            'scores': self.scores,
+            'user_index': self.user_index,
+            'persona_index': self.persona_index,
+            'persona_names': np.array(self.persona_names, dtype=str),
+        }
+        if self.user_names is not None:
+            arrays['user_names'] = np.array(self.user_names, dtype=str)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            user_names = data['user_names'].tolist() if 'user_names' in data else None
+            return cls(data['scores'], data['persona_names'].tolist(), data['user_index'], user_names)
+
+
+def score_matrix(user_embeddings, persona_embeddings):
+    """Cosine similarity of every user to every persona, row-normalized to percentages"""
+    users = np.asarray(user_embeddings, dtype=np.float32)
+    personas = np.asarray(persona_embeddings, dtype=np.float32)
+    users = users / np.maximum(np.linalg.norm(users, axis=1, keepdims=True), 1e-12)
+    personas = personas / np.maximum(np.linalg.norm(personas, axis=1, keepdims=True), 1e-12)
+
+    return to_percentages(users @ personas.T)
+
+
+def to_percentages(similarities):
+    """Row-normalize a users x personas similarity matrix so each row sums to 100"""
+    totals = similarities.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(totals != 0, similarities / totals * 100, 0)
+    return percentages.astype(np.float32)
+
+
+def match_users_to_personas(users_list, personas_list, batch_size=32, cache_dir=EMBEDDING_CACHE_DIR, workers=1):
+    """Score every user against every persona and return a PersonaMatches matrix"""
     persona_texts = [flatten_persona(persona) for persona in personas_list]
-    persona_embeddings = model.encode(persona_texts, convert_to_numpy=True)
-    
-    print("Persona embeddings shape:", persona_embeddings.shape)
-    # Process users in batches
-    for i in range(0, len(users_list), batch_size):
-        batch = users_list[i:i + batch_size]
-        
-        # Create user embeddings for the batch
-        user_texts = [flatten_user(user) for user in batch]
-        user_embeddings = model.encode(user_texts, convert_to_numpy=True)
-        
-        # Calculate similarities for each user in the batch
-        similarities = cosine_similarity(user_embeddings, persona_embeddings)
-        
-        # Convert similarities to percentages and store results
-        for j, user in enumerate(batch):
-            print("User:", i)
-            user_similarities = similarities[j]
-            # Convert to percentages
-            percentages = (user_similarities / np.sum(user_similarities)) * 100
-            
-            # Store results in user object
-            user['persona_matches'] = {
-                personas_list[k]['persona_name']: {
-                    'similarity_percentage': round(float(percentage), 2),
-                    # 'match_details': {
-                    #     'demographics': personas_list[k]['demographics'],
-                    #     'primary_needs': personas_list[k]['needs'],
-                    #     'key_pain_points': personas_list[k]['pain_points']
-                    # }
-                }
-                for k, percentage in enumerate(percentages)
-            }
-    
-    return users_list
+    persona_embeddings = encode_texts(persona_texts, batch_size=batch_size, cache_dir=cache_dir)
+
+    # Only new or changed users go through the model, the rest come from the cache
+    user_texts = [flatten_user(user) for user in users_list]
+    user_embeddings = encode_texts(user_texts, batch_size=batch_size, cache_dir=cache_dir, workers=workers)
+
+    return PersonaMatches(
+        score_matrix(user_embeddings, persona_embeddings),
+        [persona['persona_name'] for persona in personas_list],
+        user_names=[str(user.get('name', '')) for user in users_list],
+    )
+
+
+def process_users_and_personas(users_list, personas_list, batch_size=32, cache_dir=EMBEDDING_CACHE_DIR, workers=1):
+    """Process users and personas and store per-user 'persona_matches' dicts"""
+    matches = match_users_to_personas(users_list, personas_list, batch_size, cache_dir, workers)
+    return matches.attach(users_list)
+
+class IncrementalMatcher:
+    """Keeps investor embeddings and per-persona score columns between persona edits.
+
+    update_personas() diffs the new persona list against the previous one by
+    content hash of the flattened persona text; only added or changed personas
+    are encoded and only their columns of the similarity matrix are computed.
+    """
+
+    def __init__(self, users_list, batch_size=32, cache_dir=EMBEDDING_CACHE_DIR, workers=1):
+        self.users_list = users_list
+        self.batch_size = batch_size
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._user_embeddings = None
+        self._columns = {}
+        self.last_recomputed = 0
+
+    @property
+    def user_embeddings(self):
+        if self._user_embeddings is None:
+            embeddings = np.asarray(encode_texts([flatten_user(user) for user in self.users_list], batch_size=self.batch_size,
+                                                 cache_dir=self.cache_dir, workers=self.workers), dtype=np.float32)
+            self._user_embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return self._user_embeddings
+
+    def update_personas(self, personas_list):
+        """Return PersonaMatches for personas_list, recomputing only changed personas"""
+        texts = [flatten_persona(persona) for persona in personas_list]
+        keys = [text_key(text, MODEL_NAME) for text in texts]
+
+        changed = {key: text for key, text in zip(keys, texts) if key not in self._columns}
+        if changed:
+            embeddings = np.asarray(encode_texts(list(changed.values()), batch_size=self.batch_size, cache_dir=self.cache_dir),
+                                    dtype=np.float32)
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+            similarities = self.user_embeddings @ embeddings.T
+            for j, key in enumerate(changed):
+                self._columns[key] = similarities[:, j]
+        self.last_recomputed = len(changed)
+
+        # Forget personas that were edited away
+        self._columns = {key: self._columns[key] for key in keys}
+        similarities = np.stack([self._columns[key] for key in keys], axis=1) if keys else np.zeros((len(self.users_list), 0))
+        return PersonaMatches(
+            to_percentages(similarities),
+            [persona['persona_name'] for persona in personas_list],
+            user_names=[str(user.get('name', '')) for user in self.users_list],
+        )
+
+
+class FieldEmbeddings:
+    """Normalized per-field embeddings of a list of records.
+
+    vectors[field] is (n_records, dim); present[field] marks records whose field
+    text was non-empty (missing fields are left out of the weighted score).
+    """
+
+    def __init__(self, vectors, present):
+        self.vectors = vectors
+        self.present = present
+
+    @classmethod
+    def encode(cls, records, field_texts, batch_size=32, cache_dir=EMBEDDING_CACHE_DIR, workers=1):
+        texts = [field_texts(record) for record in records]
+        vectors, present = {}, {}
+        for field in FIELD_NAMES:
+            column = [t[field] for t in texts]
+            mask = np.array([bool(text) for text in column], dtype=bool)
+            non_empty = [text for text in column if text]
+            encoded = np.asarray(encode_texts(non_empty, batch_size=batch_size, cache_dir=cache_dir, workers=workers),
+                                 dtype=np.float32) if non_empty else None
+            dim = encoded.shape[1] if encoded is not None else 0
+            field_vectors = np.zeros((len(records), dim), dtype=np.float32)
+            if encoded is not None:
+                field_vectors[mask] = encoded / np.maximum(np.linalg.norm(encoded, axis=1, keepdims=True), 1e-12)
+            vectors[field], present[field] = field_vectors, mask
+        return cls(vectors, present)
+
+
+def weighted_field_similarity(user_fields, persona_fields, weights=None):
+    """Query-time weighted sum of per-field cosine similarities, shape (n_users, n_personas).
+
+    Each user-persona pair is averaged over the fields both of them have, so a
+    missing field does not drag the score down.
+    """
+    weights = DEFAULT_FIELD_WEIGHTS if weights is None else weights
+    n_users = len(next(iter(user_fields.present.values())))
+    n_personas = len(next(iter(persona_fields.present.values())))
+    total = np.zeros((n_users, n_personas), dtype=np.float32)
+    weight_sum = np.zeros((n_users, n_personas), dtype=np.float32)
+    for field in FIELD_NAMES:
+        weight = weights.get(field, 0.0)
+        if not weight or not user_fields.vectors[field].shape[1] or not persona_fields.vectors[field].shape[1]:
+            continue
+        both = np.outer(user_fields.present[field], persona_fields.present[field]).astype(np.float32)
+        total += weight * both * (user_fields.vectors[field] @ persona_fields.vectors[field].T)
+        weight_sum += weight * both
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(weight_sum > 0, total / weight_sum, 0).astype(np.float32)
+
+
+def match_users_to_personas_by_field(users_list, personas_list, weights=None, user_fields=None, batch_size=32,
+                                     cache_dir=EMBEDDING_CACHE_DIR, workers=1):
+    """PersonaMatches from per-field embeddings combined with the given field weights.
+
+    Pass precomputed user_fields to re-weight without touching the encoder.
+    """
+    if user_fields is None:
+        user_fields = FieldEmbeddings.encode(users_list, user_field_texts, batch_size, cache_dir, workers)
+    persona_fields = FieldEmbeddings.encode(personas_list, persona_field_texts, batch_size, cache_dir)
+    return PersonaMatches(
+        to_percentages(weighted_field_similarity(user_fields, persona_fields, weights)),
+        [persona['persona_name'] for persona in personas_list],
+        user_names=[str(user.get('name', '')) for user in users_list],
+    )
+
+
+def build_investor_index(users_list, path=INVESTOR_INDEX_PATH, ids=None, nlist=None, batch_size=32,
+                         cache_dir=EMBEDDING_CACHE_DIR, workers=1, dtype='float32'):
+    """Build an IVF index over investor embeddings and save it to path (if given).
+
+    dtype='float16' or 'int8' keeps the stored vectors quantized in memory and on disk.
+    """
+    user_embeddings = encode_texts([flatten_user(user) for user in users_list], batch_size=batch_size,
+                                   cache_dir=cache_dir, workers=workers)
+    index = IVFIndex.build(user_embeddings, ids=ids, nlist=nlist, dtype=dtype)
+    if path:
+        index.save(path)
+    return index
+
+
+def add_investors(index, users_list, ids=None, path=None, batch_size=32, cache_dir=EMBEDDING_CACHE_DIR, workers=1):
+    """Add new investors to an existing index without rebuilding it"""
+    user_embeddings = encode_texts([flatten_user(user) for user in users_list], batch_size=batch_size,
+                                   cache_dir=cache_dir, workers=workers)
+    index.add(user_embeddings, ids)
+    if path:
+        index.save(path)
+    return index
+
+
+def top_k_investors(persona, k=10, index=None, nprobe=None, cache_dir=EMBEDDING_CACHE_DIR):
+    """Return [(investor_id, cosine_similarity), ...] for the k investors closest to a persona"""
+    if index is None:
+        index = get_investor_index()
+    persona_embedding = encode_texts([flatten_persona(persona)], cache_dir=cache_dir)
+    ids, scores = index.search(persona_embedding, k, nprobe)
+    return [(int(i), float(score)) for i, score in zip(ids[0], scores[0]) if i >= 0]
 
 def save_results(processed_users, output_file='processed_users.json'):
     """Save processed results to a JSON file"""
     with open(output_file, 'w') as f:
-        json.dump(processed_users, f, indent=2)
-
-
+        json.dump(processed_users, f, separators=(',', ':'))
 
-# Load your data
-import csv
-import json
 
 def csv_to_json(csv_file_path):
     # Read CSV file and convert each row to a dictionary (object)
@@ -148,15 +475,114 @@ def csv_to_json(csv_file_path):
             data.append(dict(row))  # Convert each row to a dictionary and add to list
     
     return data
-# Example usage
-users_list = csv_to_json('sheet1.csv')[:50]
 
-# Load personas data
-personas_list= [{"persona_name":"Tech-Savvy Entrepreneur","demographics":{"age":30,"gender":"Male","location":"San Francisco, CA","education":"MBA","occupation":"Startup Founder"},"psychographics":{"interests":["technology","innovation","business growth"],"values":["creativity","disruption","efficiency"],"lifestyle":"Fast-paced, focused on networking and growth","attitudes":"Open to new ideas, risk-taker"},"pain_points":"Struggles with scaling technology solutions and finding reliable tech partners.","needs":"Looking for innovative tech solutions that can help streamline operations.","how_company_addresses_needs":"Sundai provides cutting-edge hacking solutions that can be tailored to enhance business efficiency.","preferred_communication_channels":"Email, LinkedIn, Tech forums","preferred_device_type":"Smartphone, Laptop","trigger_events":"Funding rounds, product launches, tech conferences","purchasing_behavior":"Researches extensively, seeks peer recommendations, values demos.","potential_objections":"Concerns about the reliability and security of hacking solutions.","influences_and_motivators":"Peer success stories, industry trends, potential ROI.","goals_and_aspirations":"To lead a successful startup that revolutionizes its industry.","pitch":"Unlock your startup's potential with our tailored hacking solutions designed for innovative entrepreneurs."},{"persona_name":"Corporate IT Manager","demographics":{"age":40,"gender":"Female","location":"New York, NY","education":"Bachelor's in Computer Science","occupation":"IT Manager"},"psychographics":{"interests":["cybersecurity","networking","project management"],"values":["security","reliability","teamwork"],"lifestyle":"Structured, focused on team collaboration and project deadlines","attitudes":"Cautious, prefers proven solutions"},"pain_points":"Facing increasing cybersecurity threats and pressure to protect company data.","needs":"Requires robust security solutions that are easy to implement and manage.","how_company_addresses_needs":"Sundai offers advanced hacking solutions that enhance cybersecurity measures.","preferred_communication_channels":"Email, Webinars, Professional networks","preferred_device_type":"Desktop, Laptop","trigger_events":"Cybersecurity incidents, budget approvals, compliance audits","purchasing_behavior":"Follows a formal procurement process, involves multiple stakeholders.","potential_objections":"Worries about integration with existing systems and potential downtime.","influences_and_motivators":"Industry certifications, peer recommendations, case studies.","goals_and_aspirations":"To ensure the security and integrity of the company's IT infrastructure.","pitch":"Secure your company's future with our proven hacking solutions that protect against evolving threats."},{"persona_name":"Freelance Developer","demographics":{"age":28,"gender":"Non-binary","location":"Austin, TX","education":"Self-taught","occupation":"Freelance Software Developer"},"psychographics":{"interests":["coding","open-source projects","tech meetups"],"values":["independence","innovation","community"],"lifestyle":"Flexible, often working remotely or in co-working spaces","attitudes":"Curious, enjoys experimenting with new technologies"},"pain_points":"Limited access to advanced tools and resources for personal projects.","needs":"Wants affordable, high-quality tools that enhance development skills.","how_company_addresses_needs":"Sundai provides accessible hacking tools that empower developers to enhance their projects.","preferred_communication_channels":"Social media, GitHub, Developer forums","preferred_device_type":"Laptop, Tablet","trigger_events":"Project deadlines, new technology releases, community events","purchasing_behavior":"Tends to buy based on reviews and community feedback.","potential_objections":"Concerns about the learning curve and support availability.","influences_and_motivators":"Community endorsements, online tutorials, peer feedback.","goals_and_aspirations":"To build innovative projects and establish a strong portfolio.","pitch":"Empower your development with our innovative hacking tools designed for freelancers."},{"persona_name":"Small Business Owner","demographics":{"age":35,"gender":"Female","location":"Chicago, IL","education":"Bachelor's in Business Administration","occupation":"Owner of a local retail store"},"psychographics":{"interests":["local business development","community engagement","sustainability"],"values":["community","customer service","sustainability"],"lifestyle":"Busy, juggling multiple roles within the business","attitudes":"Community-focused, values personal relationships"},"pain_points":"Struggles with online presence and protecting customer data.","needs":"Looking for solutions that enhance online security and improve customer engagement.","how_company_addresses_needs":"Sundai provides user-friendly hacking solutions that help secure customer data and enhance online presence.","preferred_communication_channels":"Email, Facebook, In-person meetings","preferred_device_type":"Smartphone, Desktop","trigger_events":"Customer data breaches, local business events, seasonal sales","purchasing_behavior":"Relies on recommendations from other small business owners.","potential_objections":"Worries about cost and complexity of implementation.","influences_and_motivators":"Local business networks, success stories from similar businesses.","goals_and_aspirations":"To grow her business and create a loyal customer base.","pitch":"Protect your customers and grow your business with our tailored hacking solutions for small businesses."},{"persona_name":"Cybersecurity Student","demographics":{"age":22,"gender":"Male","location":"Los Angeles, CA","education":"Bachelor's in Cybersecurity","occupation":"Student"},"psychographics":{"interests":["hacking","ethical hacking competitions","technology trends"],"values":["knowledge","ethics","innovation"],"lifestyle":"Active, involved in campus activities and tech clubs","attitudes":"Eager to learn, passionate about cybersecurity"},"pain_points":"Limited access to real-world hacking tools and resources.","needs":"Wants hands-on experience with industry-standard tools.","how_company_addresses_needs":"Sundai offers educational hacking tools that provide practical experience for students.","preferred_communication_channels":"Social media, university forums, email","preferred_device_type":"Laptop, Desktop","trigger_events":"Internship opportunities, hackathons, cybersecurity workshops","purchasing_behavior":"Influenced by academic recommendations and peer reviews.","potential_objections":"Concerns about affordability and relevance of tools.","influences_and_motivators":"Mentorship from professors, participation in competitions.","goals_and_aspirations":"To become a skilled cybersecurity professional and secure a job in the industry.","pitch":"Gain hands-on experience with our educational hacking tools designed for aspiring cybersecurity professionals."}]
 
-# Process the data
-processed_users = process_users_and_personas(users_list, personas_list)
+def iter_csv_chunks(csv_file_path, chunk_size=1024, skip_rows=0, limit=None):
+    """Yield lists of at most chunk_size row dicts without loading the whole file"""
+    with open(csv_file_path, mode='r', encoding='utf-8', newline='') as csv_file:
+        stop = None if limit is None else skip_rows + limit
+        rows = itertools.islice(csv.DictReader(csv_file), skip_rows, stop)
+        while True:
+            chunk = [dict(row) for row in itertools.islice(rows, chunk_size)]
+            if not chunk:
+                return
+            yield chunk
+
+
+def _completed_lines(output_file):
+    """Count complete JSONL records and drop a trailing half-written line"""
+    if not os.path.exists(output_file):
+        return 0
+    with open(output_file, 'rb+') as f:
+        count, last_newline, offset = 0, 0, 0
+        for line in f:
+            offset += len(line)
+            if line.endswith(b'\n'):
+                count += 1
+                last_newline = offset
+        f.truncate(last_newline)
+    return count
+
+
+def stream_matches(csv_file_path, personas_list, output_file, chunk_size=1024, batch_size=32,
+                   cache_dir=None, resume=True, limit=None, workers=1):
+    """Match a CSV of investors to personas chunk by chunk, appending JSONL as it goes.
+
+    Only one chunk of rows and embeddings is held in memory at a time. Every
+    chunk is flushed before the next one is read, so an interrupted run leaves
+    a valid prefix behind, and with resume=True a re-run continues after it.
+    The embedding cache is off by default since its index grows with the input.
+    """
+    persona_names = [persona['persona_name'] for persona in personas_list]
+    persona_embeddings = encode_texts([flatten_persona(p) for p in personas_list], batch_size=batch_size, cache_dir=cache_dir)
+
+    done = _completed_lines(output_file) if resume else 0
+    if limit is not None:
+        limit = max(limit - done, 0)
+    if done:
+        print(f"Resuming after {done} already matched rows")
+
+    row_number = done
+    with open(output_file, 'a' if resume else 'w', encoding='utf-8') as out:
+        for chunk in iter_csv_chunks(csv_file_path, chunk_size, skip_rows=done, limit=limit):
+            user_embeddings = encode_texts([flatten_user(user) for user in chunk], batch_size=batch_size,
+                                           cache_dir=cache_dir, workers=workers)
+            matches = PersonaMatches(score_matrix(user_embeddings, persona_embeddings), persona_names)
+            for user, persona_matches in zip(chunk, matches.to_dicts()):
+                user['row'] = row_number
+                user['persona_matches'] = persona_matches
+                out.write(json.dumps(user) + '\n')
+                row_number += 1
+            out.flush()
+            print(f"Matched {row_number} rows")
+    return row_number
+
+
+# Example personas used by the CLI when no --personas file is given
+EXAMPLE_PERSONAS = [{"persona_name":"Tech-Savvy Entrepreneur","demographics":{"age":30,"gender":"Male","location":"San Francisco, CA","education":"MBA","occupation":"Startup Founder"},"psychographics":{"interests":["technology","innovation","business growth"],"values":["creativity","disruption","efficiency"],"lifestyle":"Fast-paced, focused on networking and growth","attitudes":"Open to new ideas, risk-taker"},"pain_points":"Struggles with scaling technology solutions and finding reliable tech partners.","needs":"Looking for innovative tech solutions that can help streamline operations.","how_company_addresses_needs":"Sundai provides cutting-edge hacking solutions that can be tailored to enhance business efficiency.","preferred_communication_channels":"Email, LinkedIn, Tech forums","preferred_device_type":"Smartphone, Laptop","trigger_events":"Funding rounds, product launches, tech conferences","purchasing_behavior":"Researches extensively, seeks peer recommendations, values demos.","potential_objections":"Concerns about the reliability and security of hacking solutions.","influences_and_motivators":"Peer success stories, industry trends, potential ROI.","goals_and_aspirations":"To lead a successful startup that revolutionizes its industry.","pitch":"Unlock your startup's potential with our tailored hacking solutions designed for innovative entrepreneurs."},{"persona_name":"Corporate IT Manager","demographics":{"age":40,"gender":"Female","location":"New York, NY","education":"Bachelor's in Computer Science","occupation":"IT Manager"},"psychographics":{"interests":["cybersecurity","networking","project management"],"values":["security","reliability","teamwork"],"lifestyle":"Structured, focused on team collaboration and project deadlines","attitudes":"Cautious, prefers proven solutions"},"pain_points":"Facing increasing cybersecurity threats and pressure to protect company data.","needs":"Requires robust security solutions that are easy to implement and manage.","how_company_addresses_needs":"Sundai offers advanced hacking solutions that enhance cybersecurity measures.","preferred_communication_channels":"Email, Webinars, Professional networks","preferred_device_type":"Desktop, Laptop","trigger_events":"Cybersecurity incidents, budget approvals, compliance audits","purchasing_behavior":"Follows a formal procurement process, involves multiple stakeholders.","potential_objections":"Worries about integration with existing systems and potential downtime.","influences_and_motivators":"Industry certifications, peer recommendations, case studies.","goals_and_aspirations":"To ensure the security and integrity of the company's IT infrastructure.","pitch":"Secure your company's future with our proven hacking solutions that protect against evolving threats."},{"persona_name":"Freelance Developer","demographics":{"age":28,"gender":"Non-binary","location":"Austin, TX","education":"Self-taught","occupation":"Freelance Software Developer"},"psychographics":{"interests":["coding","open-source projects","tech meetups"],"values":["independence","innovation","community"],"lifestyle":"Flexible, often working remotely or in co-working spaces","attitudes":"Curious, enjoys experimenting with new technologies"},"pain_points":"Limited access to advanced tools and resources for personal projects.","needs":"Wants affordable, high-quality tools that enhance development skills.","how_company_addresses_needs":"Sundai provides accessible hacking tools that empower developers to enhance their projects.","preferred_communication_channels":"Social media, GitHub, Developer forums","preferred_device_type":"Laptop, Tablet","trigger_events":"Project deadlines, new technology releases, community events","purchasing_behavior":"Tends to buy based on reviews and community feedback.","potential_objections":"Concerns about the learning curve and support availability.","influences_and_motivators":"Community endorsements, online tutorials, peer feedback.","goals_and_aspirations":"To build innovative projects and establish a strong portfolio.","pitch":"Empower your development with our innovative hacking tools designed for freelancers."},{"persona_name":"Small Business Owner","demographics":{"age":35,"gender":"Female","location":"Chicago, IL","education":"Bachelor's in Business Administration","occupation":"Owner of a local retail store"},"psychographics":{"interests":["local business development","community engagement","sustainability"],"values":["community","customer service","sustainability"],"lifestyle":"Busy, juggling multiple roles within the business","attitudes":"Community-focused, values personal relationships"},"pain_points":"Struggles with online presence and protecting customer data.","needs":"Looking for solutions that enhance online security and improve customer engagement.","how_company_addresses_needs":"Sundai provides user-friendly hacking solutions that help secure customer data and enhance online presence.","preferred_communication_channels":"Email, Facebook, In-person meetings","preferred_device_type":"Smartphone, Desktop","trigger_events":"Customer data breaches, local business events, seasonal sales","purchasing_behavior":"Relies on recommendations from other small business owners.","potential_objections":"Worries about cost and complexity of implementation.","influences_and_motivators":"Local business networks, success stories from similar businesses.","goals_and_aspirations":"To grow her business and create a loyal customer base.","pitch":"Protect your customers and grow your business with our tailored hacking solutions for small businesses."},{"persona_name":"Cybersecurity Student","demographics":{"age":22,"gender":"Male","location":"Los Angeles, CA","education":"Bachelor's in Cybersecurity","occupation":"Student"},"psychographics":{"interests":["hacking","ethical hacking competitions","technology trends"],"values":["knowledge","ethics","innovation"],"lifestyle":"Active, involved in campus activities and tech clubs","attitudes":"Eager to learn, passionate about cybersecurity"},"pain_points":"Limited access to real-world hacking tools and resources.","needs":"Wants hands-on experience with industry-standard tools.","how_company_addresses_needs":"Sundai offers educational hacking tools that provide practical experience for students.","preferred_communication_channels":"Social media, university forums, email","preferred_device_type":"Laptop, Desktop","trigger_events":"Internship opportunities, hackathons, cybersecurity workshops","purchasing_behavior":"Influenced by academic recommendations and peer reviews.","potential_objections":"Concerns about affordability and relevance of tools.","influences_and_motivators":"Mentorship from professors, participation in competitions.","goals_and_aspirations":"To become a skilled cybersecurity professional and secure a job in the industry.","pitch":"Gain hands-on experience with our educational hacking tools designed for aspiring cybersecurity professionals."}]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Match investors to customer personas by embedding similarity")
+    parser.add_argument("--users", default="sheet1.csv", help="CSV file of investors")
+    parser.add_argument("--personas", help="JSON file with a list of personas (defaults to the bundled examples)")
+    parser.add_argument("--output", default="users_with_similarities.npz",
+                        help="Output file; .npz writes the columnar match matrix, .json the legacy per-user dicts, "
+                             ".jsonl streams the CSV in chunks with bounded memory")
+    parser.add_argument("--limit", type=int, default=50, help="Only match the first N investors (0 for all)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--chunk-size", type=int, default=1024, help="Rows per chunk in .jsonl streaming mode")
+    parser.add_argument("--cache-dir", default=EMBEDDING_CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=1, help="Encoder processes (one model copy each) for CPU-only hosts")
+    parser.add_argument("--field-weights", help="Match on per-field embeddings with these weights, "
+                                                "e.g. '{\"description\": 2, \"location\": 0.5}'")
+    args = parser.parse_args(argv)
+
+    if args.personas:
+        with open(args.personas, 'r', encoding='utf-8') as f:
+            personas_list = json.load(f)
+    else:
+        personas_list = EXAMPLE_PERSONAS
+
+    if args.output.endswith('.jsonl'):
+        stream_matches(args.users, personas_list, args.output, args.chunk_size, args.batch_size,
+                       limit=args.limit or None, workers=args.workers)
+        return
+
+    users_list = load_investors(args.users).to_dicts()
+    if args.limit:
+        users_list = users_list[:args.limit]
+
+    if args.field_weights:
+        matches = match_users_to_personas_by_field(users_list, personas_list, json.loads(args.field_weights),
+                                                   batch_size=args.batch_size, cache_dir=args.cache_dir, workers=args.workers)
+    else:
+        matches = match_users_to_personas(users_list, personas_list, args.batch_size, args.cache_dir, args.workers)
+    if args.output.endswith('.json'):
+        save_results(matches.attach(users_list), args.output)
+    else:
+        matches.save(args.output)
+
 
-# Save results
-with open('users_with_similarities.json', 'w') as f:
-    json.dump(processed_users, f, indent=2)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import numpy as np
+
+from src.quantization import ScalarQuantizer
+
+# Upper bound on the vectors k-means is trained on
+TRAIN_SIZE_CAP = 50000
+
+
+def _normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _spherical_kmeans(vectors, nlist, n_iter=20, seed=0):
+    """Cosine k-means on already normalized vectors, returns normalized centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = (vectors @ centroids.T).argmax(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=nlist)
+        # Re-seed empty clusters with random points so every list stays usable
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file (IVF-Flat) index for cosine top-k search over embeddings.
+
+    Vectors are bucketed by their nearest k-means centroid; a query only scans
+    the nprobe closest buckets. New vectors can be added at any time without
+    retraining, they are simply appended to their nearest bucket.
+    Vectors can be stored as float16 or int8 (see ScalarQuantizer) to cut memory.
+    """
+
+    def __init__(self, centroids, nprobe=8, quantizer=None):
+        self.centroids = _normalize(centroids)
+        self.dim = self.centroids.shape[1]
+        self.nprobe = nprobe
+        self.quantizer = quantizer or ScalarQuantizer('float32')
+        self.vectors = np.empty((0, self.dim), dtype=self.quantizer.dtype)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.assignments = np.empty(0, dtype=np.int64)
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(len(self.centroids))]
+        self._size = 0
+
+    @classmethod
+    def build(cls, embeddings, ids=None, nlist=None, nprobe=8, train_size=None, seed=0, dtype='float32'):
+        """Train centroids (and the quantizer) on (a sample of) embeddings and add all of them"""
+        vectors = _normalize(embeddings)
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+        # Fixed cap so k-means cost stops growing with the corpus once it is large
+        train_size = train_size or max(min(64 * nlist, TRAIN_SIZE_CAP), 10000, nlist)
+        rng = np.random.default_rng(seed)
+        sample = vectors if len(vectors) <= train_size else vectors[rng.choice(len(vectors), train_size, replace=False)]
+
+        quantizer = ScalarQuantizer(dtype).fit(sample)
+        index = cls(_spherical_kmeans(sample, nlist, seed=seed), nprobe=nprobe, quantizer=quantizer)
+        index.add(vectors, ids)
+        return index
+
+    def __len__(self):
+        return self._size
+
+    def add(self, embeddings, ids=None):
+        """Append vectors to their nearest lists; ids default to insertion order"""
+        vectors = _normalize(embeddings)
+        if ids is None:
+            ids = np.arange(self._size, self._size + len(vectors), dtype=np.int64)
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) != len(vectors):
+            raise ValueError("ids and embeddings must have the same length")
+
+        # Grow storage geometrically so repeated small adds stay amortized O(1)
+        needed = self._size + len(vectors)
+        if needed > len(self.vectors):
+            capacity = max(needed, 2 * len(self.vectors), 1024)
+            self.vectors = np.resize(self.vectors, (capacity, self.dim))
+            self.ids = np.resize(self.ids, capacity)
+            self.assignments = np.resize(self.assignments, capacity)
+
+        rows = np.arange(self._size, needed, dtype=np.int64)
+        assignments = (vectors @ self.centroids.T).argmax(axis=1)
+        self.vectors[rows] = self.quantizer.encode(vectors)
+        self.ids[rows] = ids
+        self.assignments[rows] = assignments
+        self._size = needed
+
+        for list_no in np.unique(assignments):
+            self.lists[list_no] = np.concatenate([self.lists[list_no], rows[assignments == list_no]])
+
+    def search(self, queries, k=10, nprobe=None):
+        """Return (ids, scores) arrays of shape (n_queries, k), best first.
+
+        Slots that could not be filled (fewer than k candidates) hold id -1.
+        """
+        queries = _normalize(queries)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for qi, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[list_no] for list_no in probes[qi]])
+            if len(candidates) == 0:
+                continue
+            scores = self.quantizer.score(self.vectors[candidates], query)[:, 0]
+            top = min(k, len(candidates))
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            out_ids[qi, :top] = self.ids[candidates[best]]
+            out_scores[qi, :top] = scores[best]
+        return out_ids, out_scores
+
+    def save(self, path):
+        np.savez(
+            path,
+            centroids=self.centroids,
+            vectors=self.vectors[:self._size],
+            ids=self.ids[:self._size],
+            assignments=self.assignments[:self._size],
+            nprobe=self.nprobe,
+            dtype=self.quantizer.dtype,
+            scale=np.zeros(0) if self.quantizer.scale is None else self.quantizer.scale,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            dtype = str(data['dtype']) if 'dtype' in data else 'float32'
+            scale = data['scale'] if 'scale' in data and len(data['scale']) else None
+            index = cls(data['centroids'], nprobe=int(data['nprobe']), quantizer=ScalarQuantizer(dtype, scale))
+            index.vectors = data['vectors']
+            index.ids = data['ids']
+            index.assignments = data['assignments']
+        index._size = len(index.ids)
+        # Rebuild the inverted lists from the stored assignments
+        order = np.argsort(index.assignments, kind='stable')
+        bounds = np.searchsorted(index.assignments[order], np.arange(len(index.centroids) + 1))
+        index.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(index.centroids))]
+        return index
@@ -0,0 +1,191 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# Replicated-column Hungarian builds an I x (copies + I) matrix; beyond this many cells use min-cost flow
+HUNGARIAN_MAX_CELLS = 1_000_000
+# Min-cost flow re-ranks a hypothesis' members after this many investors joined it
+REINDEX_AFTER_JOINS = 256
+
+
+def capacity_array(hyp_ids, capacities):
+    """int (same for every hypothesis) or {hyp_id: capacity} -> int array aligned with hyp_ids"""
+    if isinstance(capacities, dict):
+        return np.array([capacities.get(hyp_id, 0) for hyp_id in hyp_ids], dtype=int)
+    return np.full(len(hyp_ids), capacities, dtype=int)
+
+
+def total_utility(scores, assignment):
+    rows = np.flatnonzero(assignment >= 0)
+    return float(scores[rows, assignment[rows]].sum())
+
+
+def greedy_assignment(scores, capacities):
+    """The original heuristic: best investors first, each to its best hypothesis that still has room"""
+    remaining = np.array(capacities, dtype=int)
+    assignment = np.full(len(scores), -1)
+    masked = np.where(np.isnan(scores), -np.inf, scores)
+    for i in np.argsort(-masked.max(axis=1), kind="stable"):
+        row = np.where(remaining > 0, masked[i], -np.inf)
+        best = int(row.argmax())
+        if row[best] > -np.inf:
+            assignment[i] = best
+            remaining[best] -= 1
+    return assignment
+
+
+def hungarian_assignment(scores, capacities):
+    """Exact: each hypothesis repeated once per slot, plus one zero-value 'unassigned' column per investor"""
+    n_investors = len(scores)
+    slots = np.repeat(np.arange(scores.shape[1]), np.minimum(capacities, n_investors))
+    finite = scores[~np.isnan(scores)]
+    forbidden = -(np.abs(finite).max() + 1) * (n_investors + 1) if finite.size else -1.0
+    values = np.concatenate([np.nan_to_num(scores, nan=forbidden)[:, slots], np.zeros((n_investors, n_investors))], axis=1)
+    rows, cols = linear_sum_assignment(values, maximize=True)
+    assignment = np.full(n_investors, -1)
+    placed = cols < len(slots)
+    assignment[rows[placed]] = slots[cols[placed]]
+    return assignment
+
+
+def flow_assignment(scores, capacities):
+    """Exact successive-shortest-path min-cost flow, specialised for few hypotheses.
+
+    Investors are inserted one by one while the partial assignment stays
+    optimal. The residual graph only has H + 1 nodes (the hypotheses plus an
+    'unassigned' node), where edge h -> g is the best gain from moving one
+    investor from h to g, so each insertion is a tiny Bellman-Ford longest-path
+    search followed by a chain of moves. Investors whose favourite hypothesis
+    still has room are placed in bulk first, which is already optimal.
+    """
+    n_investors, n_hyps = scores.shape
+    out = n_hyps
+    capacities = np.minimum(capacities, n_investors)
+    # Value of sitting in each node; being unassigned is worth 0
+    values = np.concatenate([np.where(np.isnan(scores), -np.inf, scores), np.zeros((n_investors, 1))], axis=1)
+    owner = np.full(n_investors, -1)  # -1 = not inserted yet
+    count = np.zeros(n_hyps + 1, dtype=int)
+    open_node = np.append(capacities > 0, True)
+
+    # Bulk phase: while everyone sits at their favourite node no move can gain anything
+    favourite = values.argmax(axis=1)
+    order = np.lexsort((-values[np.arange(n_investors), favourite], favourite))
+    start = np.searchsorted(favourite[order], np.arange(n_hyps + 1))
+    rank = np.arange(n_investors) - start[favourite[order]]
+    room = np.append(capacities, n_investors)
+    bulk = order[rank < room[favourite[order]]]
+    owner[bulk] = favourite[bulk]
+    count += np.bincount(owner[bulk], minlength=n_hyps + 1)
+    open_node[:n_hyps] = count[:n_hyps] < capacities
+
+    gain = np.full((n_hyps + 1, n_hyps + 1), -np.inf)  # gain[h, g]: best move of one investor from h to g
+    mover = np.zeros((n_hyps + 1, n_hyps + 1), dtype=int)
+    nodes = np.arange(n_hyps + 1)
+    # Per node: members ranked by gain for every destination, a cursor per destination
+    # skipping members that left, and the investors that joined since the ranking was built
+    ranked, cursor, joined = {}, {}, {}
+
+    def index_node(node):
+        members = np.flatnonzero(owner == node)
+        moves = values[members] - values[members, node][:, None]
+        ranked[node] = members[np.argsort(-moves, axis=0, kind="stable")]
+        cursor[node] = np.zeros(n_hyps + 1, dtype=int)
+        joined[node] = []
+        if members.size:
+            mover[node] = ranked[node][0]
+            gain[node] = values[mover[node], nodes] - values[mover[node], node]
+        else:
+            gain[node] = -np.inf
+        gain[node, node] = -np.inf
+
+    def refresh(node, column):
+        order, k = ranked[node][:, column], cursor[node][column]
+        while k < len(order) and owner[order[k]] != node:
+            k += 1
+        cursor[node][column] = k
+        best, best_gain = 0, -np.inf
+        if k < len(order):
+            best, best_gain = order[k], values[order[k], column] - values[order[k], node]
+        recent = np.array(joined[node], dtype=int)
+        recent = recent[owner[recent] == node]
+        if recent.size:
+            moves = values[recent, column] - values[recent, node]
+            if moves.max() > best_gain:
+                best, best_gain = recent[moves.argmax()], moves.max()
+        gain[node, column] = best_gain
+        mover[node, column] = best
+
+    def join(investor, node):
+        owner[investor] = node
+        joined[node].append(investor)
+        moves = values[investor] - values[investor, node]
+        better = moves > gain[node]
+        better[node] = False
+        gain[node, better] = moves[better]
+        mover[node, better] = investor
+
+    for node in nodes:
+        index_node(node)
+
+    for i in np.flatnonzero(owner < 0)[np.argsort(-values[owner < 0].max(axis=1), kind="stable")]:
+        dist = values[i].copy()
+        pred = np.full(n_hyps + 1, -1)
+        for _ in range(n_hyps + 1):
+            via = dist[:, None] + gain
+            src = via.argmax(axis=0)
+            reach = via[src, nodes]
+            improved = reach > dist + 1e-9
+            if not improved.any():
+                break
+            dist[improved] = reach[improved]
+            pred[improved] = src[improved]
+        end = int(np.where(open_node, dist, -np.inf).argmax())
+
+        # Walk the path back: every hop moves one investor forward
+        hops, node, seen = [], end, set()
+        while pred[node] >= 0 and node not in seen:
+            seen.add(node)
+            hops.append((mover[pred[node], node], pred[node], node))
+            node = pred[node]
+        for investor, _, _ in hops:
+            owner[investor] = -2
+        for investor, _, dest in hops:
+            join(investor, dest)
+        join(i, node)
+        # Only edges whose best mover just left need a rescan
+        for investor, src_node, _ in hops:
+            if len(joined[src_node]) > REINDEX_AFTER_JOINS:
+                index_node(src_node)
+                continue
+            for column in np.flatnonzero(mover[src_node] == investor):
+                if column != src_node:
+                    refresh(src_node, column)
+        count[end] += 1
+        open_node[end] = end == out or count[end] < capacities[end]
+
+    return np.where(owner == out, -1, owner)
+
+
+def assign(scores, capacities, method="auto"):
+    """Optimal capacity-constrained assignment of investors (rows) to hypotheses (columns).
+
+    Returns (assignment, report): assignment[i] is the column investor i got,
+    -1 if none; report compares total utility against the greedy heuristic.
+    """
+    capacities = np.asarray(capacities, dtype=int)
+    if method == "auto":
+        slots = np.minimum(capacities, len(scores)).sum()
+        method = "hungarian" if len(scores) * (slots + len(scores)) <= HUNGARIAN_MAX_CELLS else "flow"
+    solver = {"hungarian": hungarian_assignment, "flow": flow_assignment, "greedy": greedy_assignment}[method]
+    assignment = solver(scores, capacities)
+
+    utility = total_utility(scores, assignment)
+    greedy_utility = total_utility(scores, greedy_assignment(scores, capacities))
+    report = {
+        "method": method,
+        "assigned": int((assignment >= 0).sum()),
+        "utility": round(utility, 3),
+        "greedy_utility": round(greedy_utility, 3),
+        "gain_vs_greedy": round(utility - greedy_utility, 3),
+    }
+    print(f"Assignment: {report}")
+    return assignment, report
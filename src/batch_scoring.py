@@ -0,0 +1,73 @@
+import json
+import os
+import time
+import uuid
+
+import openai
+
+from src import llm_client
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def write_batch_file(path, requests, model, endpoint=BATCH_ENDPOINT):
+    """Write {custom_id: messages} as a provider batch-API JSONL input file"""
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, messages in requests.items():
+            line = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": endpoint,
+                "body": {"model": model, "messages": messages},
+            }
+            f.write(json.dumps(line) + "\n")
+    return path
+
+
+def submit_batch(client, path, endpoint=BATCH_ENDPOINT, completion_window="24h"):
+    with open(path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(input_file_id=input_file.id, endpoint=endpoint, completion_window=completion_window)
+    print(f"Submitted batch {batch.id} ({path})")
+    return batch
+
+
+def wait_for_batch(client, batch_id, poll_interval=30):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"Batch {batch_id}: {batch.status} ({counts.completed}/{counts.total} done, {counts.failed} failed)")
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+
+def read_batch_output(client, batch):
+    """{custom_id: message content} for every request that succeeded"""
+    outputs = {}
+    if not batch.output_file_id:
+        return outputs
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") == 200:
+            outputs[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    return outputs
+
+
+def run_batch(requests, model, client=None, workdir=".", poll_interval=30, completion_window="24h"):
+    """Submit {custom_id: messages} as one batch job, wait for it and return {custom_id: content}.
+
+    Requests missing from the result failed on the provider side.
+    """
+    client = client or openai.OpenAI(http_client=llm_client.http_client())
+    path = write_batch_file(os.path.join(workdir, f"batch_input_{uuid.uuid4().hex}.jsonl"), requests, model)
+    batch = submit_batch(client, path, completion_window=completion_window)
+    batch = wait_for_batch(client, batch.id, poll_interval)
+    if batch.status != "completed":
+        print(f"Batch {batch.id} ended with status {batch.status}")
+    return read_batch_output(client, batch)
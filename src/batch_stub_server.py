@@ -0,0 +1,168 @@
+"""Local stand-in for the OpenAI Files + Batches endpoints, for testing batch scoring.
+
+    python src/batch_stub_server.py --port 8089
+    client = openai.OpenAI(base_url="http://127.0.0.1:8089/v1", api_key="stub")
+
+Every chat completion request in a batch is answered with a well-formed
+<scratchpad>/<score> reply whose scores are derived from the custom_id, so
+runs are reproducible.
+"""
+import argparse
+import email.parser
+import email.policy
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.score_tensor import RUBRICS
+
+
+files = {}
+batches = {}
+_lock = threading.Lock()
+
+
+def fake_completion(custom_id):
+    digest = hashlib.sha256(custom_id.encode("utf-8")).digest()
+    scores = {rubric: digest[i] % 11 for i, rubric in enumerate(RUBRICS)}
+    return f"<scratchpad>\nStub analysis for {custom_id}.\n</scratchpad>\n<score>\n{json.dumps(scores, indent=4)}\n</score>"
+
+
+def new_file(content, filename, purpose):
+    file_id = f"file-{uuid.uuid4().hex[:24]}"
+    files[file_id] = {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(content),
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "status": "processed",
+        "content": content,
+    }
+    return files[file_id]
+
+
+def process_batch(batch):
+    """Answer every line of the batch input file and attach the output file"""
+    lines = []
+    for line in files[batch["input_file_id"]]["content"].decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        lines.append(json.dumps({
+            "id": f"batch_req_{uuid.uuid4().hex[:16]}",
+            "custom_id": request["custom_id"],
+            "response": {
+                "status_code": 200,
+                "request_id": uuid.uuid4().hex,
+                "body": {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:16]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request["body"]["model"],
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": fake_completion(request["custom_id"])},
+                        "finish_reason": "stop",
+                    }],
+                },
+            },
+            "error": None,
+        }))
+    output = new_file(("\n".join(lines) + "\n").encode("utf-8"), f"{batch['id']}_output.jsonl", "batch_output")
+    batch.update(
+        status="completed",
+        output_file_id=output["id"],
+        completed_at=int(time.time()),
+        request_counts={"total": len(lines), "completed": len(lines), "failed": 0},
+    )
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        with _lock:
+            if self.path == "/v1/files":
+                # Parse the multipart upload with the stdlib email parser
+                raw = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + self._body()
+                message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(raw)
+                fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+                upload = fields["file"]
+                record = new_file(upload.get_payload(decode=True), upload.get_filename() or "upload.jsonl",
+                                  fields["purpose"].get_content().strip())
+                return self._send_json({k: v for k, v in record.items() if k != "content"})
+
+            if self.path == "/v1/batches":
+                request = json.loads(self._body())
+                batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+                batches[batch_id] = {
+                    "id": batch_id,
+                    "object": "batch",
+                    "endpoint": request["endpoint"],
+                    "input_file_id": request["input_file_id"],
+                    "completion_window": request["completion_window"],
+                    "status": "in_progress",
+                    "created_at": int(time.time()),
+                    "output_file_id": None,
+                    "error_file_id": None,
+                    "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                }
+                return self._send_json(batches[batch_id])
+
+        self._send_json({"error": {"message": f"Unknown route {self.path}"}}, 404)
+
+    def do_GET(self):
+        with _lock:
+            match = re.fullmatch(r"/v1/batches/([\w-]+)", self.path)
+            if match and match.group(1) in batches:
+                batch = batches[match.group(1)]
+                # Report in_progress once so clients exercise their polling loop
+                if batch["status"] == "in_progress" and batch.pop("_polled", False):
+                    process_batch(batch)
+                else:
+                    batch["_polled"] = True
+                return self._send_json({k: v for k, v in batch.items() if not k.startswith("_")})
+
+            match = re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)
+            if match and match.group(1) in files:
+                content = files[match.group(1)]["content"]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                return
+
+        self._send_json({"error": {"message": f"Unknown route {self.path}"}}, 404)
+
+
+def serve(host="127.0.0.1", port=8089):
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Batch stub server listening on http://{host}:{port}/v1")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    serve(args.host, args.port).serve_forever()
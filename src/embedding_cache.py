@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# text_key is a sha256 hexdigest, so every line of the key log has the same length
+KEY_LINE_BYTES = 65
+
+
+def text_key(text, model_name):
+    """Content hash of a flattened text for a given embedding model"""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk, content-addressed store of sentence embeddings.
+
+    Rows live in a flat file that is appended to and read back through
+    np.memmap, so warm runs do not copy the stored vectors. keys.txt holds one
+    text_key per line in row order: a key's row is its line number, and an
+    append only adds lines instead of rewriting an index. Appends hold a thread
+    lock and a file lock, and anything past the last row present in both files
+    (left by a writer that crashed mid-append) is cut off before writing.
+    Each (model, dtype) gets its own subdirectory of cache_dir, so several
+    models can share one cache_dir without touching each other's rows.
+    """
+
+    def __init__(self, cache_dir, model_name, dtype=np.float32):
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        store_name = re.sub(r"[^\w.-]", "_", model_name) + "-" + self.dtype.name
+        self.cache_dir = os.path.join(cache_dir, store_name)
+        self.meta_path = os.path.join(self.cache_dir, "meta.json")
+        self.keys_path = os.path.join(self.cache_dir, "keys.txt")
+        self.data_path = os.path.join(self.cache_dir, "embeddings.bin")
+        self.lock_path = os.path.join(self.cache_dir, "append.lock")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.dim = None
+        self.index = {}
+        self._mmap = None
+        self._lock = threading.Lock()
+        with self._locked():
+            meta = self._read_meta()
+            if meta is None:
+                self._reset()
+            elif meta.get("model") != model_name or meta.get("dtype") != self.dtype.str:
+                raise ValueError(f"{self.cache_dir} holds embeddings of {meta.get('model')} ({meta.get('dtype')}), not {model_name}")
+            else:
+                self.dim = meta["dim"]
+            self._read_new_keys()
+            self._truncate_to_index()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _read_meta(self):
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_meta(self):
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dtype": self.dtype.str, "dim": self.dim}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _reset(self):
+        # New store: drop rows a writer left without ever recording their meta
+        for path in (self.keys_path, self.data_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._write_meta()
+
+    def _row_bytes(self):
+        return self.dim * self.dtype.itemsize if self.dim else 0
+
+    def _complete_rows(self):
+        """Rows with both a whole key line and a whole vector on disk"""
+        keys = os.path.getsize(self.keys_path) // KEY_LINE_BYTES if os.path.exists(self.keys_path) else 0
+        if not self._row_bytes():
+            return 0
+        data = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        return min(keys, data // self._row_bytes())
+
+    def _read_new_keys(self):
+        """Pick up rows appended since the last read, by this or another process"""
+        if self.dim is None:
+            meta = self._read_meta()
+            self.dim = meta["dim"] if meta else None
+        rows = self._complete_rows()
+        if rows <= len(self.index):
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(len(self.index) * KEY_LINE_BYTES)
+            lines = f.read((rows - len(self.index)) * KEY_LINE_BYTES).decode("ascii").split("\n")[:-1]
+        for key in lines:
+            self.index[key] = len(self.index)
+
+    def _truncate_to_index(self):
+        """Cut torn key lines and orphan vectors past the last complete row; call with the lock held"""
+        for path, size in ((self.keys_path, len(self.index) * KEY_LINE_BYTES),
+                           (self.data_path, len(self.index) * self._row_bytes())):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def _rows(self):
+        """Memory-mapped view over every stored embedding"""
+        if self._mmap is None or self._mmap.shape[0] != len(self.index):
+            if not self.index:
+                return np.empty((0, self.dim or 0), dtype=self.dtype)
+            self._mmap = np.memmap(self.data_path, dtype=self.dtype, mode="r", shape=(len(self.index), self.dim))
+        return self._mmap
+
+    def _append(self, keys, embeddings):
+        embeddings = np.ascontiguousarray(embeddings, dtype=self.dtype)
+        with self._locked():
+            self._read_new_keys()
+            if self.dim is None:
+                self.dim = int(embeddings.shape[1])
+                self._write_meta()
+            elif embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {embeddings.shape[1]} does not match cache dim {self.dim}")
+            self._truncate_to_index()
+
+            # Another process may have stored some of these while we were encoding
+            new = [k for k, key in enumerate(keys) if key not in self.index]
+            if not new:
+                return
+            # Vectors first, then keys: a row only counts once its key line is complete
+            with open(self.data_path, "ab") as f:
+                f.write(embeddings[new].tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write("".join(keys[k] + "\n" for k in new).encode("ascii"))
+            for k in new:
+                self.index[keys[k]] = len(self.index)
+
+    def get_or_encode(self, texts, encode_fn):
+        """Return embeddings for texts in order, encoding only unseen ones.
+
+        encode_fn takes a list of strings and returns a 2D array.
+        """
+        keys = [text_key(text, self.model_name) for text in texts]
+        with self._lock:
+            self._read_new_keys()
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.index and key not in missing:
+                missing[key] = text
+        if missing:
+            print(f"Encoding {len(missing)} new texts ({len(texts) - len(missing)} cached)")
+            self._append(list(missing.keys()), encode_fn(list(missing.values())))
+
+        rows = self._rows()
+        positions = np.fromiter((self.index[key] for key in keys), dtype=np.int64, count=len(keys))
+        # Contiguous hit ranges (the common warm-run case) stay zero-copy slices
+        if len(positions) and np.array_equal(positions, np.arange(positions[0], positions[0] + len(positions))):
+            return rows[positions[0]:positions[0] + len(positions)]
+        return rows[positions]
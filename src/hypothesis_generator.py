@@ -1,13 +1,38 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
 from src.openai_api import OpenAIApi
-from src.utils import parse_llm_response
+from src.prompts import hypotheis_update_prompt
+from src.utils import PersonaStreamParser
+from src.response_cache import ResponseCache, response_key
+from src.llm_client import event_loop
 
 from dotenv import load_dotenv
 load_dotenv()
 
 
 openai_api = OpenAIApi()
+_response_cache = None
+_response_cache_lock = threading.Lock()
 
-MAX_RETRIES = 3
+PERSONA_MODEL = "gpt-4o-mini"
+TEMPERATURE = 0.4
+MAX_TOKENS = 2048
+
+# Hedged generation: at most this many requests per generation (the first plus hedges).
+# Another one starts when a request fails, or when the running ones are slower than
+# HEDGE_PERCENTILE of recent generations (HEDGE_AFTER seconds until enough are recorded)
+MAX_CANDIDATES = 3
+HEDGE_PERCENTILE = 90
+HEDGE_AFTER = 20.0
+HEDGE_MIN_SAMPLES = 5
+generation_latencies = deque(maxlen=50)
 
 
 prompt = """
@@ -81,36 +106,193 @@ Remember to focus solely on generating customer personas based on the given info
 """
 
 
-def generate_hypothesis(company_details):
+def get_response_cache():
+    """Shared by generate_hypothesis, edit_hypothesis and the chat update in main.py; opened on first use"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+def persona_key(model, messages):
+    return response_key(model, messages, temperature=TEMPERATURE, max_tokens=MAX_TOKENS)
+
+
+def stream_personas(messages, on_persona=None, on_text=None, model=PERSONA_MODEL, force=False):
+    """Stream a persona response through a PersonaStreamParser and return the parser.
+
+    on_persona gets each persona as soon as it is complete, on_text the response
+    so far. Responses that parsed are cached by request content and replayed
+    instantly on the next identical request, unless force is set.
+    """
+    key = persona_key(model, messages)
+    cached = None if force else get_response_cache().get(key)
+    if cached is not None:
+        print(f"Persona response served from the response cache ({model})")
+        chunks = [cached]
+    else:
+        chunks = openai_api.stream_completion(messages, model=model, temperature=TEMPERATURE, max_tokens=MAX_TOKENS)
+
+    parser = PersonaStreamParser()
+    try:
+        for chunk in chunks:
+            for persona in parser.feed(chunk):
+                if on_persona is not None:
+                    on_persona(persona)
+            if on_text is not None:
+                on_text(parser.text)
+    except Exception as e:
+        # Personas already shown are kept; only a broken tail is lost
+        if not parser.personas:
+            raise
+        print(f"Persona stream failed after {len(parser.personas)} personas: {e}")
+        return parser
+    if cached is None and valid_personas(parser):
+        get_response_cache().put(key, parser.text)
+    return parser
+
+
+def valid_personas(parser):
+    """A complete, non-empty persona list (a truncated stream does not count)"""
+    personas = parser.result()
+    if parser.personas and not parser.complete:
+        return False
+    return isinstance(personas, list) and len(personas) > 0 and all(
+        isinstance(person, dict) and person.get("persona_name") for person in personas)
+
+
+def hedge_delay():
+    """Seconds to wait for the running requests before hedging with another one"""
+    if len(generation_latencies) < HEDGE_MIN_SAMPLES:
+        return HEDGE_AFTER
+    return float(np.percentile(generation_latencies, HEDGE_PERCENTILE))
+
+
+async def race_personas(messages, model, events, max_candidates, hedge_after):
+    """Run hedged persona requests on the shared LLM loop; the first valid response wins.
+
+    Every parsed persona is put on `events` as (candidate, persona), and a
+    candidate that errors or finishes without a valid list as (candidate, None).
+    Returns (parser, won): the winner's parser, or when nothing validated the
+    failed one that got furthest. Requests still in flight at the end are cancelled.
+    """
+    async def candidate(k):
+        parser, start, valid = PersonaStreamParser(), time.time(), False
+        try:
+            async for chunk in openai_api.astream_completion(messages, model=model, temperature=TEMPERATURE, max_tokens=MAX_TOKENS):
+                for persona in parser.feed(chunk):
+                    events.put((k, persona))
+            valid = valid_personas(parser)
+        except Exception as e:
+            print(f"Persona request {k + 1} failed: {e}")
+        if not valid:
+            events.put((k, None))
+        return k, parser, valid, time.time() - start
+
+    started, running, best = [], set(), None
+
+    def launch():
+        running.add(asyncio.create_task(candidate(len(started))))
+        started.append(time.time())
+
+    launch()
+    try:
+        while running:
+            delay = None
+            if len(started) < max_candidates:
+                wait = hedge_delay() if hedge_after is None else hedge_after
+                delay = max(0.0, wait - (time.time() - started[-1]))
+            done, running = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                print(f"No persona response after {time.time() - started[-1]:.1f}s, hedging with request {len(started) + 1}")
+                launch()
+                continue
+            for task in done:
+                k, parser, valid, latency = task.result()
+                if valid:
+                    generation_latencies.append(latency)
+                    print(f"Persona request {k + 1} of {len(started)} won after {latency:.1f}s")
+                    return parser, True
+                if best is None or len(parser.personas) > len(best.personas):
+                    best = parser
+            # A failed request is replaced right away instead of waiting for the hedge delay
+            if len(started) < max_candidates:
+                launch()
+        return best, False
+    finally:
+        for task in running:
+            task.cancel()
+
+
+def hedged_personas(messages, on_persona=None, model=PERSONA_MODEL, force=False,
+                    max_candidates=MAX_CANDIDATES, hedge_after=None, on_restart=None):
+    """Generate personas with hedged parallel requests, returning the personas or None.
+
+    hedge_after=0 launches every candidate up front; None hedges at the latency
+    percentile. on_persona is called from this thread with the personas of the
+    request being followed: the first one to produce a persona, then, if it
+    fails, the surviving request that got furthest. on_restart is called before
+    such a switch so the caller can drop the personas it already shows; the
+    switched-to request's personas so far are then replayed to on_persona.
+    """
+    if not force and get_response_cache().get(persona_key(model, messages)) is not None:
+        return stream_personas(messages, on_persona, model=model).result()
+
+    events = queue.Queue()
+    race = asyncio.run_coroutine_threadsafe(
+        race_personas(messages, model, events, max_candidates, hedge_after), event_loop())
+    race.add_done_callback(lambda _: events.put(None))
+    streamed, failed, leader = {}, set(), None
+    try:
+        for k, persona in iter(events.get, None):
+            if persona is None:
+                failed.add(k)
+            else:
+                streamed.setdefault(k, []).append(persona)
+            if leader is not None and leader not in failed:
+                if k == leader and persona is not None and on_persona is not None:
+                    on_persona(persona)
+                continue
+            # No leader yet, or it failed: follow the surviving request with the most personas
+            alive = [c for c in streamed if c not in failed]
+            if not alive:
+                continue
+            new_leader = max(alive, key=lambda c: len(streamed[c]))
+            if leader is not None:
+                print(f"Persona request {leader + 1} failed, following request {new_leader + 1}")
+                if on_restart is not None:
+                    on_restart()
+            leader = new_leader
+            if on_persona is not None:
+                for shown in streamed[leader]:
+                    on_persona(shown)
+        parser, won = race.result()
+    finally:
+        race.cancel()
+
+    if won:
+        get_response_cache().put(persona_key(model, messages), parser.text)
+    return parser.result()
+
+
+def generate_hypothesis(company_details, on_persona=None, force=False, on_restart=None):
     messages = [{'role': 'system', 'content': system_prompt},
         {"role": "user", "content": prompt.format(company_details=company_details)}]
+    return hedged_personas(messages, on_persona, force=force, on_restart=on_restart)
 
-    hypothesis = None
-    for _ in range(MAX_RETRIES):
-        try:
-            response = openai_api.get_completion(messages, model="gpt-4o-mini")
-            hypothesis = parse_llm_response(response)                
-            if hypothesis is not None:
-                return hypothesis
-            
-        except:
-            pass
-    return hypothesis
 
+def update_messages(company_details, hypothesis, conversation, user_input):
+    """Messages asking the model to rewrite the personas after a chat message (main.py)"""
+    return [{"role": "user", "content": hypotheis_update_prompt.format(
+        company_details=json.dumps(company_details),
+        customer_personas=json.dumps(hypothesis),
+        conversation_history=json.dumps(conversation),
+        user_input=user_input,
+    )}]
 
 
-def edit_hypothesis(hypothesis, conversation):
+def edit_hypothesis(hypothesis, conversation, on_persona=None, force=False, on_restart=None):
     messages = [{'role': 'system', 'content': system_prompt},
         {"role": "user", "content": prompt.format(company_details=conversation)}]
-
-    hypothesis = None
-    for _ in range(MAX_RETRIES):
-        try:
-            response = openai_api.get_completion(messages, model="gpt-4o-mini")
-            hypothesis = parse_llm_response(response)                
-            if hypothesis is not None:
-                return hypothesis
-            
-        except:
-            pass
-    return hypothesis
+    return hedged_personas(messages, on_persona, force=force, on_restart=on_restart)
@@ -0,0 +1,174 @@
+import ast
+import csv
+import hashlib
+import json
+import os
+
+# Source CSV column -> typed column of the store
+SCORE_COLUMN = "[Investors who invest in devtools, AI infra, SaaS, tech at pre-seed stage, and located in san franciso] -> score"
+TEXT_COLUMNS = {
+    "name": "name",
+    "current location": "current_location",
+    "description": "description",
+    "website": "website",
+    "current firm name": "firm_name",
+    "firm url": "firm_url",
+    "firm description": "firm_description",
+}
+LIST_COLUMNS = ("investment_stages", "investment_verticals")
+
+_loaded = {}
+
+
+def parse_python_literal(value):
+    """Dict stored as its Python repr (as in sheet1.csv) -> dict, {} when empty or malformed"""
+    if isinstance(value, dict):
+        return value
+    if not value or not isinstance(value, str):
+        return {}
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def split_list(value):
+    """'Seed, Pre-seed' -> ['Seed', 'Pre-seed']"""
+    if isinstance(value, list):
+        return value
+    return [part.strip() for part in str(value or "").split(",") if part.strip()]
+
+
+def firm_investment(investor):
+    """'firm investment' of a raw or typed investor dict as {'investment_stages': str, 'investment_verticals': str}"""
+    return parse_python_literal(investor.get("firm investment"))
+
+
+def parse_row(row):
+    """Raw CSV/JSONL investor row -> dict of typed columns"""
+    record = {typed: (row.get(raw) or None) for raw, typed in TEXT_COLUMNS.items()}
+    investment = firm_investment(row)
+    for column in LIST_COLUMNS:
+        record[column] = split_list(investment.get(column))
+    record["other_links"] = {k: str(v) for k, v in parse_python_literal(row.get("other links")).items() if v}
+    try:
+        record["score"] = float(row[SCORE_COLUMN])
+    except (KeyError, TypeError, ValueError):
+        record["score"] = None
+    return record
+
+
+class InvestorView:
+    """Read-only view of one row of an InvestorTable"""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def __getattr__(self, column):
+        try:
+            return self._table.columns[column][self._row]
+        except KeyError:
+            raise AttributeError(column) from None
+
+    def __repr__(self):
+        return f"InvestorView({self.name!r})"
+
+    def to_dict(self):
+        """Legacy dict with the raw column names, nested fields as real dicts"""
+        investor = {raw: getattr(self, typed) or "" for raw, typed in TEXT_COLUMNS.items()}
+        investor["other links"] = dict(self.other_links)
+        investor["firm investment"] = {column: ", ".join(getattr(self, column)) for column in LIST_COLUMNS}
+        if self.score is not None:
+            investor[SCORE_COLUMN] = self.score
+        return investor
+
+
+class InvestorTable:
+    """Investors held column by column with typed stages/verticals lists and link maps"""
+
+    def __init__(self, columns, version=None):
+        self.columns = columns
+        self.version = version
+
+    def __len__(self):
+        return len(self.columns["name"])
+
+    def __getitem__(self, row):
+        if not -len(self) <= row < len(self):
+            raise IndexError(row)
+        return InvestorView(self, row % len(self))
+
+    def __iter__(self):
+        return (InvestorView(self, row) for row in range(len(self)))
+
+    def to_dicts(self):
+        return [view.to_dict() for view in self]
+
+    @classmethod
+    def from_rows(cls, rows, version=None):
+        records = [parse_row(row) for row in rows]
+        names = list(TEXT_COLUMNS.values()) + list(LIST_COLUMNS) + ["other_links", "score"]
+        return cls({name: [record[name] for record in records] for name in names}, version)
+
+    def save(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema(
+            [(name, pa.string()) for name in TEXT_COLUMNS.values()]
+            + [(name, pa.list_(pa.string())) for name in LIST_COLUMNS]
+            + [("other_links", pa.map_(pa.string(), pa.string())), ("score", pa.float64())],
+            metadata={"source_version": self.version or ""},
+        )
+        columns = dict(self.columns)
+        columns["other_links"] = [list(links.items()) for links in columns["other_links"]]
+        pq.write_table(pa.table(columns, schema=schema), path)
+
+    @classmethod
+    def load(cls, path):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        columns = table.to_pydict()
+        columns["other_links"] = [dict(links) for links in columns["other_links"]]
+        version = (table.schema.metadata or {}).get(b"source_version", b"").decode()
+        return cls(columns, version)
+
+
+def file_version(path):
+    """Content hash identifying one version of a source dataset"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ingest_csv(csv_path, store_path=None):
+    """Parse a raw investor CSV (or JSONL, one row per line) once and persist it as Parquet next to it"""
+    store_path = store_path or os.path.splitext(csv_path)[0] + ".parquet"
+    with open(csv_path, mode="r", encoding="utf-8", newline="") as f:
+        rows = (json.loads(line) for line in f if line.strip()) if csv_path.endswith(".jsonl") else csv.DictReader(f)
+        table = InvestorTable.from_rows(rows, version=file_version(csv_path))
+    table.save(store_path)
+    return table
+
+
+def load_investors(csv_path="sheet1.csv", store_path=None):
+    """Typed investor table for csv_path (.csv or .jsonl), re-ingesting only when its content changed"""
+    store_path = store_path or os.path.splitext(csv_path)[0] + ".parquet"
+    version = file_version(csv_path)
+
+    cached = _loaded.get(store_path)
+    if cached is not None and cached.version == version:
+        return cached
+    table = InvestorTable.load(store_path) if os.path.exists(store_path) else None
+    if table is None or table.version != version:
+        print(f"Ingesting {csv_path} into {store_path}")
+        table = ingest_csv(csv_path, store_path)
+    _loaded[store_path] = table
+    return table
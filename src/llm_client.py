@@ -0,0 +1,105 @@
+import asyncio
+import os
+import threading
+
+import httpx
+
+# Pool limits for every LLM call in the process, overridable from the environment
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 64))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 32))
+KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", 60))
+# Same overall timeout the OpenAI SDK uses by default
+REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 600))
+CONNECT_TIMEOUT = 10.0
+
+_lock = threading.Lock()
+_http_client = None
+_async_http_client = None
+_loop = None
+
+
+def configure(max_connections=None, max_keepalive_connections=None, keepalive_expiry=None, request_timeout=None):
+    """Change the pool settings before the first LLM call.
+
+    OpenAIApi, JambaAIApi and the scoring models in process_investor_list only
+    take their clients on first use, so importing them first is fine; once a
+    client has been handed out the pool is fixed and this raises.
+    """
+    global MAX_CONNECTIONS, MAX_KEEPALIVE_CONNECTIONS, KEEPALIVE_EXPIRY, REQUEST_TIMEOUT
+    with _lock:
+        if _http_client is not None or _async_http_client is not None:
+            raise RuntimeError("LLM connection pool is already in use; configure it at startup")
+        MAX_CONNECTIONS = max_connections or MAX_CONNECTIONS
+        MAX_KEEPALIVE_CONNECTIONS = max_keepalive_connections or MAX_KEEPALIVE_CONNECTIONS
+        KEEPALIVE_EXPIRY = keepalive_expiry or KEEPALIVE_EXPIRY
+        REQUEST_TIMEOUT = request_timeout or REQUEST_TIMEOUT
+
+
+def _pool_settings():
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                          keepalive_expiry=KEEPALIVE_EXPIRY)
+    return {"limits": limits, "timeout": httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)}
+
+
+def http_client():
+    """Process-wide keep-alive httpx.Client shared by every sync LLM client"""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(**_pool_settings())
+        return _http_client
+
+
+def event_loop():
+    """Background event loop that owns the async pool; all async LLM I/O runs on it"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-client-loop", daemon=True).start()
+        return _loop
+
+
+def async_http_client():
+    """Process-wide keep-alive httpx.AsyncClient; only use it on event_loop(), via run/on_loop"""
+    global _async_http_client
+    event_loop()
+    with _lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(**_pool_settings())
+        return _async_http_client
+
+
+def run(coro):
+    """Sync wrapper: run a coroutine on the shared loop and block until it finishes.
+
+    Do not call it from the shared loop itself; await the coroutine there instead.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, event_loop()).result()
+
+
+async def on_loop(coro):
+    """Await a coroutine on the shared loop from any other event loop (asyncio.run, worker threads)"""
+    loop = event_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def _next(iterator):
+    try:
+        return True, await iterator.__anext__()
+    except StopAsyncIteration:
+        return False, None
+
+
+async def iterate_on_loop(iterator):
+    """Drive an async iterator on the shared loop, yielding its items to the caller's loop"""
+    try:
+        while True:
+            more, item = await on_loop(_next(iterator))
+            if not more:
+                return
+            yield item
+    finally:
+        await on_loop(iterator.aclose())
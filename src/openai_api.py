@@ -1,11 +1,36 @@
+import time
 import openai
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
 from ai21 import AI21Client
 from ai21.models.chat import UserMessage, SystemMessage
+from src.llm_client import async_http_client, http_client, iterate_on_loop
+
+
+def _chunk_text(chunk) -> str:
+    """Text delta of one streamed chat completion chunk ('' for role/usage-only chunks)"""
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
 
 class OpenAIApi:
     def __init__(self, api_key: Optional[str] = None):
-        self.client = openai.OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self._client = None
+        self._async_client = None
+
+    # Created on first use from llm_client's shared pools, so llm_client.configure() can run after import
+    @property
+    def client(self) -> openai.OpenAI:
+        if self._client is None:
+            self._client = openai.OpenAI(api_key=self.api_key, http_client=http_client())
+        return self._client
+
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        if self._async_client is None:
+            self._async_client = openai.AsyncOpenAI(api_key=self.api_key, http_client=async_http_client())
+        return self._async_client
 
     def get_completion(
         self,
@@ -23,34 +48,150 @@ class OpenAIApi:
                 temperature=temperature,
                 max_tokens=max_tokens
             )
-            print("Response:", response)
+            print("Usage:", response.usage)
             return response.choices[0].message.content
         except openai.OpenAIError as e:
             raise Exception(f"OpenAI API error: {str(e)}")
-        
-class JambaAIApi:
-    def __init__(self, api_key: Optional[str] = None):
-        self.client = AI21Client(api_key=api_key)
 
-    def get_completion(
+    def stream_completion(
         self,
         messages: List[Dict[str, str]],
-        model: str = "jamba-1.5-large",
+        model: str = "gpt-4-0125-preview",
         temperature: float = 0.4,
-        max_tokens: int = 2048
-    ) -> str:
+        max_tokens: int = 2048,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> Iterator[str]:
+        """Yield the completion text piece by piece as the model generates it"""
+        try:
+            start = time.time()
+            stream = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            first = True
+            try:
+                for chunk in stream:
+                    text = _chunk_text(chunk)
+                    if not text:
+                        continue
+                    if first:
+                        print(f"{model}: first token after {time.time() - start:.2f}s")
+                        first = False
+                    if on_chunk is not None:
+                        on_chunk(text)
+                    yield text
+            finally:
+                # Also reached when the consumer stops early: give the connection back to the pool
+                stream.close()
+            print(f"{model}: stream finished after {time.time() - start:.2f}s")
+        except openai.OpenAIError as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+
+    async def astream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "gpt-4-0125-preview",
+        temperature: float = 0.4,
+        max_tokens: int = 2048,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> AsyncIterator[str]:
+        """Async version of stream_completion; the request runs on the shared LLM loop"""
+        async for text in iterate_on_loop(self._astream(messages, model, temperature, max_tokens)):
+            if on_chunk is not None:
+                on_chunk(text)
+            yield text
+
+    async def _astream(self, messages, model, temperature, max_tokens) -> AsyncIterator[str]:
+        try:
+            start = time.time()
+            stream = await self.async_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            first = True
+            try:
+                async for chunk in stream:
+                    text = _chunk_text(chunk)
+                    if not text:
+                        continue
+                    if first:
+                        print(f"{model}: first token after {time.time() - start:.2f}s")
+                        first = False
+                    yield text
+            finally:
+                # Also reached on cancellation: give the connection back to the pool
+                await stream.close()
+            print(f"{model}: stream finished after {time.time() - start:.2f}s")
+        except openai.OpenAIError as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+
+
+class JambaAIApi:
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._client = None
+
+    @property
+    def client(self) -> AI21Client:
+        if self._client is None:
+            self._client = AI21Client(api_key=self.api_key, http_client=http_client())
+        return self._client
+
+    @staticmethod
+    def _messages(messages: List[Dict[str, str]]):
         mm = []
         for m in messages:
             if m["role"]=="user":
                 mm.append(UserMessage(content=m["content"]))
             elif m["role"]=="system":
                 mm.append(SystemMessage(content=m["content"]))
+        return mm
+
+    def get_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "jamba-1.5-large",
+        temperature: float = 0.4,
+        max_tokens: int = 2048
+    ) -> str:
         try:
             response = self.client.chat.completions.create(
                 model=model,
-                messages=mm,
+                messages=self._messages(messages),
                 top_p=temperature,
             )
             return str(response.choices[0].message.content)
-        except:
-            raise Exception("Jamba")
+        except Exception as e:
+            raise Exception("Jamba") from e
+
+    def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "jamba-1.5-large",
+        temperature: float = 0.4,
+        max_tokens: int = 2048,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> Iterator[str]:
+        """Yield the completion text piece by piece as the model generates it"""
+        try:
+            stream = self.client.chat.completions.create(
+                model=model,
+                messages=self._messages(messages),
+                top_p=temperature,
+                stream=True,
+            )
+            for chunk in stream:
+                text = _chunk_text(chunk)
+                if not text:
+                    continue
+                if on_chunk is not None:
+                    on_chunk(text)
+                yield text
+        except Exception as e:
+            raise Exception("Jamba") from e
@@ -1,11 +1,26 @@
 import numpy as np
-from scipy.optimize import linear_sum_assignment
-from copy import deepcopy
-from itertools import product
-import random
+import hashlib
+import heapq
+from collections import Counter
+from itertools import count
+import math
+import os
+import queue
 import re
 import json
-from prompt_scoring_list import score_investor_on_hypothesis
+import sys
+import threading
+# Run from src/ or imported from main.py, src modules are always imported as src.<name>
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.prompt_scoring_list import score_investor_on_hypothesis, score_investor_on_hypotheses
+from src.investor_store import firm_investment, load_investors, parse_python_literal
+from src.assignment import assign, capacity_array
+from src.score_tensor import ScoreTensor, as_score_tensor
+from src.run_journal import RunJournal
+from src.score_cache import ScoreCache, investor_digest, score_key
+from src.scoring_engine import LATENCY_TARGET, ScoringEngine
+from src.batch_scoring import run_batch
+from src import llm_client
 from langchain_openai import ChatOpenAI
 # from langchain_core.prompts import PromptTemplate
 # from langchain_core.output_parsers import SimpleJsonOutputParser
@@ -68,44 +83,440 @@ def parse_output(text: str) -> dict:
         )
 # output_parser = ScratchpadAndScoreParser()
 
-llm = ChatOpenAI(model="o1-mini", temperature=1, max_retries=10)
+# The models, the engine and the score cache are created on first use, after any
+# llm_client.configure() and without touching the disk at import
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def _get_shared(name, create):
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = create()
+        return _shared[name]
+
+
+def get_score_cache():
+    return _get_shared("score_cache", ScoreCache)
+
+
+def get_llm():
+    # Retries are handled by the ScoringEngine's run-wide budget, not per client call.
+    # Async calls go through ainvoke below, on the loop that owns the pooled connections
+    return _get_shared("llm", lambda: ChatOpenAI(
+        model="o1-mini", temperature=1, max_retries=0,
+        http_client=llm_client.http_client(), http_async_client=llm_client.async_http_client()))
+
+
+def get_cheap_llm():
+    """First-pass model of the tiered scorer; only promising pairs escalate to get_llm()"""
+    return _get_shared("cheap_llm", lambda: ChatOpenAI(
+        model="gpt-4o-mini", temperature=0, max_retries=0,
+        http_client=llm_client.http_client(), http_async_client=llm_client.async_http_client()))
+
+
+def get_scoring_engine():
+    # More in-flight calls than pooled connections would only queue inside the pool
+    return _get_shared("scoring_engine", lambda: ScoringEngine(max_concurrency=llm_client.MAX_CONNECTIONS))
+
+# o1-mini spends most of its output on hidden reasoning
+EXPECTED_COMPLETION_TOKENS = 2000
+
+# Successive halving for score_pairs_tiered: share of each hypothesis' pairs promoted
+# to the next tier (one entry per escalation), plus pairs within the margin of the cutoff
+ESCALATION_FRACTIONS = (0.5,)
+ESCALATION_MARGIN = 0.5
+
+# Investor list scored by get_aldo_data, read through src.investor_store
+INVESTORS_PATH = "investors_list_no_score.jsonl"
+
+
+def score_inputs(investor, hypothesis):
+    return {
+        "PERSON_OF_INTEREST_INFO": json.dumps(investor, indent=4),
+        "HYPOTHESIS": hypothesis["hypothesis"],
+        "PAIN_POINT": hypothesis["pain_point"],
+        "PITCH": hypothesis["pitch"],
+    }
+
+
+def estimate_tokens(arg):
+    """Rough prompt + completion token count charged against the tokens/min limit"""
+    investor, hypothesis = arg
+    prompt_chars = len(score_investor_on_hypothesis.template) + sum(map(len, score_inputs(investor, hypothesis).values()))
+    return prompt_chars // 4 + EXPECTED_COMPLETION_TOKENS
+
+
+async def ainvoke(prompt, model, inputs):
+    """prompt | model on the shared LLM loop, where the pooled async connections live"""
+    return await llm_client.on_loop((prompt | model).ainvoke(inputs))
+
+
+def pair_key(arg, template=score_investor_on_hypothesis, model=None):
+    investor, hypothesis = arg
+    return score_key(investor, hypothesis, template.template, (model or get_llm()).model_name)
+
+
+async def ascore_person(arg, model=None):
+    """Score one pair with a single LLM attempt; retries are left to the ScoringEngine"""
+    investor, hypothesis = arg
+    answer = await ainvoke(score_investor_on_hypothesis, model or get_llm(), score_inputs(investor, hypothesis))
+    parsed = parse_output(answer.content)
+    get_score_cache().put(pair_key(arg, model=model), parsed)
+    return parsed
+
+
+def unscored(arg, exc):
+    investor, _ = arg
+    print(f"Failed to process investor: {investor['name']}")
+    return None
+
+
+def split_cached(args, templates=(score_investor_on_hypothesis,), on_result=None, model=None):
+    """Fill parsed results for pairs already in the score cache, return (results, indices still to score)"""
+    results = [None] * len(args)
+    pending = []
+    for i, arg in enumerate(args):
+        cached = next(filter(None, (get_score_cache().get(pair_key(arg, template, model)) for template in templates)), None)
+        if cached is not None:
+            results[i] = cached
+            if on_result:
+                on_result(i, cached)
+        else:
+            pending.append(i)
+    print(f"{len(args) - len(pending)} pairs served from the score cache, {len(pending)} to score")
+    return results, pending
+
+
+def score_pairs(args, on_result=None, model=None, engine_options=None):
+    """Parsed scores for (investor, hypothesis) pairs, None where scoring failed.
+
+    Cached pairs are served from the score cache, the rest go through the
+    engine. on_result(index, parsed) is called as soon as each pair is scored.
+    model defaults to get_llm(); engine_options are passed on to ScoringEngine.run.
+    """
+    results, pending = split_cached(args, on_result=on_result, model=model)
+    if pending:
+        async def score_one(i):
+            parsed = await ascore_person(args[i], model)
+            if on_result:
+                on_result(i, parsed)
+            return parsed
+
+        scored = get_scoring_engine().run_sync(pending, score_one, lambda i: estimate_tokens(args[i]),
+                                         lambda i, exc: unscored(args[i], exc), **(engine_options or {}))
+        for i, parsed in zip(pending, scored):
+            results[i] = parsed
+    return results
+
+
+def escalation_candidates(indices, results, args, fraction, margin):
+    """Per hypothesis, the top `fraction` of indices by current mean score plus any within `margin` of that cutoff.
+
+    Pairs the lower tier failed to score always escalate.
+    """
+    by_hypothesis, failed = {}, []
+    for i in indices:
+        if results[i] is None:
+            failed.append(i)
+        else:
+            by_hypothesis.setdefault(args[i][1]["hyp_id"], []).append(i)
+    promoted = failed
+    for group in by_hypothesis.values():
+        scores = sorted((results[i]["mean_score"] for i in group), reverse=True)
+        cutoff = scores[max(1, math.ceil(fraction * len(scores))) - 1]
+        promoted += [i for i in group if results[i]["mean_score"] >= cutoff - margin]
+    return sorted(promoted)
+
+
+def score_pairs_tiered(args, on_result=None, tiers=None, fractions=ESCALATION_FRACTIONS, margin=ESCALATION_MARGIN,
+                       engine_options=None):
+    """Score pairs with successive halving over models, cheapest first.
+
+    Every pair gets a first-pass score from tiers[0] (get_cheap_llm() by default).
+    After each tier only the pairs escalation_candidates keeps go on to the
+    next, more expensive model (get_llm() by default). Each final result carries the
+    tier and model it came from. on_result only sees final results.
+    """
+    tiers = tiers or [get_cheap_llm(), get_llm()]
+    results = [None] * len(args)
+    candidates = list(range(len(args)))
+    for tier, model in enumerate(tiers):
+        final = tier == len(tiers) - 1
+        print(f"Tier {tier} ({model.model_name}): scoring {len(candidates)} pairs")
+
+        def tagged(parsed, tier=tier, model=model):
+            return {**parsed, "tier": tier, "model": model.model_name}
+
+        def on_final(k, parsed, candidates=candidates):
+            results[candidates[k]] = tagged(parsed)
+            if on_result:
+                on_result(candidates[k], results[candidates[k]])
+
+        scored = score_pairs([args[i] for i in candidates], on_final if final else None, model, engine_options)
+        if final:
+            # Pairs the top tier failed on keep their lower-tier score
+            for i, parsed in zip(candidates, scored):
+                if parsed is None and results[i] is not None and on_result:
+                    on_result(i, results[i])
+            break
+
+        for i, parsed in zip(candidates, scored):
+            if parsed is not None:
+                results[i] = tagged(parsed)
+        promoted = escalation_candidates(candidates, results, args, fractions[min(tier, len(fractions) - 1)], margin)
+        settled = set(candidates) - set(promoted)
+        for i in sorted(settled):
+            if results[i] is not None and on_result:
+                on_result(i, results[i])
+        candidates = promoted
+
+    by_tier = Counter(f"tier {parsed['tier']} ({parsed['model']})" for parsed in results if parsed is not None)
+    print(f"Final scores by tier: {dict(by_tier)}")
+    return results
+
+
+def group_inputs(investor, hypotheses):
+    blocks = [
+        f'<hypothesis_block hyp_id="{hyp["hyp_id"]}">\n'
+        f'<hypothesis>{hyp["hypothesis"]}</hypothesis>\n'
+        f'<pain_point>{hyp["pain_point"]}</pain_point>\n'
+        f'<pitch>{hyp["pitch"]}</pitch>\n'
+        f'</hypothesis_block>'
+        for hyp in hypotheses
+    ]
+    return {"PERSON_OF_INTEREST_INFO": json.dumps(investor, indent=4), "HYPOTHESES": "\n".join(blocks)}
+
+
+def parse_multi_output(text: str) -> dict:
+    """{hyp_id: parse_output result} for every <evaluation> block that parses; broken blocks are left out"""
+    parsed = {}
+    for hyp_id, block in re.findall(r'<evaluation hyp_id="(\d+)">(.*?)</evaluation>', text, re.DOTALL):
+        try:
+            parsed[int(hyp_id)] = parse_output(block)
+        except (OutputParserException, AttributeError, TypeError, ZeroDivisionError):
+            continue
+    return parsed
+
+
+def estimate_group_tokens(arg):
+    investor, hypotheses = arg
+    prompt_chars = len(score_investor_on_hypotheses.template) + sum(map(len, group_inputs(investor, hypotheses).values()))
+    return prompt_chars // 4 + EXPECTED_COMPLETION_TOKENS * len(hypotheses)
+
+
+async def ascore_group(arg):
+    """One LLM attempt scoring an investor on several hypotheses, returns {hyp_id: parsed}.
+
+    A single-hypothesis group uses the original one-pair prompt.
+    """
+    investor, hypotheses = arg
+    if len(hypotheses) == 1:
+        answer = await ainvoke(score_investor_on_hypothesis, get_llm(), score_inputs(investor, hypotheses[0]))
+        return {hypotheses[0]["hyp_id"]: parse_output(answer.content)}
+    answer = await ainvoke(score_investor_on_hypotheses, get_llm(), group_inputs(investor, hypotheses))
+    return parse_multi_output(answer.content)
+
+
+def score_pairs_grouped(args, on_result=None, engine_options=None):
+    """Score pairs with one LLM call per investor covering all of its hypotheses.
+
+    Hypotheses whose part of the response does not parse are split into two
+    smaller groups and retried, down to the single-pair prompt.
+    """
+    # Pairs that fell back to the single-pair prompt last time are cached under that template
+    results, pending = split_cached(args, (score_investor_on_hypotheses, score_investor_on_hypothesis), on_result)
+    by_investor = {}
+    for i in pending:
+        by_investor.setdefault(args[i][0]["id"], []).append(i)
+    groups = list(by_investor.values())
+
+    def group_arg(group):
+        return args[group[0]][0], [args[i][1] for i in group]
+
+    def keep(group, parsed):
+        """Store the pairs of a group that parsed, return the indices that did not"""
+        template = score_investor_on_hypotheses if len(group) > 1 else score_investor_on_hypothesis
+        missing = []
+        for i in group:
+            hyp_id = args[i][1]["hyp_id"]
+            if hyp_id in parsed:
+                get_score_cache().put(pair_key(args[i], template), parsed[hyp_id])
+                results[i] = parsed[hyp_id]
+                if on_result:
+                    on_result(i, parsed[hyp_id])
+            else:
+                missing.append(i)
+        return missing
+
+    async def score_group(group):
+        return keep(group, await ascore_group(group_arg(group)))
+
+    while groups:
+        print(f"Scoring {len(groups)} investor groups")
+        outputs = get_scoring_engine().run_sync(
+            groups, score_group, lambda group: estimate_group_tokens(group_arg(group)), lambda group, exc: list(group),
+            **(engine_options or {}),
+        )
+        next_groups = []
+        for group, missing in zip(groups, outputs):
+            if missing is None:
+                # Skipped because the run was stopped
+                continue
+            if len(group) == 1:
+                for i in missing:
+                    results[i] = unscored(args[i], None)
+            elif missing:
+                half = (len(missing) + 1) // 2
+                next_groups += [part for part in (missing[:half], missing[half:]) if part]
+        groups = next_groups
+    return results
+
+
+def batch_custom_id(arg):
+    investor, hypothesis = arg
+    return f"inv-{investor['id']}-hyp-{hypothesis['hyp_id']}"
+
+
+def score_pairs_batch(args, client=None, poll_interval=30, on_result=None):
+    """Score pairs through the provider batch API (one JSONL job) instead of live chat calls"""
+    results, pending = split_cached(args, on_result=on_result)
+    if not pending:
+        return results
+    requests = {
+        batch_custom_id(args[i]): [{"role": "user", "content": score_investor_on_hypothesis.format(**score_inputs(*args[i]))}]
+        for i in pending
+    }
+    outputs = run_batch(requests, get_llm().model_name, client, poll_interval=poll_interval)
+    for i in pending:
+        content = outputs.get(batch_custom_id(args[i]))
+        try:
+            if content is None:
+                raise ValueError("no result in batch output")
+            parsed = parse_output(content)
+        except (OutputParserException, ValueError) as e:
+            results[i] = unscored(args[i], e)
+            continue
+        get_score_cache().put(pair_key(args[i]), parsed)
+        results[i] = parsed
+        if on_result:
+            on_result(i, parsed)
+    return results
+
 
 @chain
 def score_person(arg):
+    """One (investor, hypothesis) pair -> investor dict with scores and the hypothesis merged in"""
     investor, hypothesis = arg
-    score_person_chain = score_investor_on_hypothesis | llm
-    # print(f"Processing investor: \033[92m{investor['name']}\033[0m with hypothesis \033[92m{hypothesis['hypothesis']}\033[0m")
-    for _ in range(5):
-        try:
-            answer = score_person_chain.invoke(
-                {
-                    "PERSON_OF_INTEREST_INFO": json.dumps(investor, indent=4),
-                    "HYPOTHESIS": hypothesis["hypothesis"],
-                    "PAIN_POINT": hypothesis["pain_point"],
-                    "PITCH": hypothesis["pitch"],
-                }
-            )
-            investor.update(parse_output(answer.content))
-            # investor["reasoning"] = answer["scratchpad"]
-            # investor["score"] = answer["score"]
-            investor.update(hypothesis)
-            # print(f"Done processing investor: {investor['name']}")
-            return investor
-        except Exception as e:
-            import traceback
-            print("Exception occurred while processing investor:")
-            print(traceback.format_exc())
-            print(f"Failed to process investor: {investor['name']}")
-    return investor
+    parsed = score_pairs([arg])[0]
+    return {**investor, **parsed, **hypothesis} if parsed is not None else dict(investor)
+
+
+def hypothesis_text(hypothesis):
+    return f"{hypothesis['hypothesis']} {hypothesis['pain_point']} {hypothesis['pitch']}"
+
+
+def persona_hypothesis(persona):
+    """Generated persona (main.py) -> the hypothesis/pain_point/pitch dict the scoring prompt expects"""
+    def text(value):
+        return "; ".join(map(str, value)) if isinstance(value, list) else str(value or "")
 
+    return {
+        "hypothesis": f"{text(persona.get('persona_name'))}: {text(persona.get('how_company_addresses_needs'))}",
+        "pain_point": text(persona.get("pain_points")),
+        "pitch": text(persona.get("pitch")),
+    }
+
+
+def prefilter_pairs(investors_list, hypotheses, top_k=None, threshold=None):
+    """Cheap embedding ranking of every (investor, hypothesis) pair before LLM scoring.
+
+    Keeps the top_k investors per hypothesis and/or every pair whose cosine
+    similarity is at least threshold. Returns the kept (investor index,
+    hypothesis index) pairs and the full similarity matrix.
+    """
+    from similarity import encode_texts, flatten_user
+
+    investor_embeddings = np.asarray(encode_texts([flatten_user(inv) for inv in investors_list]), dtype=np.float32)
+    hypothesis_embeddings = np.asarray(encode_texts([hypothesis_text(hyp) for hyp in hypotheses]), dtype=np.float32)
+    # Out of place: cached embeddings come back as read-only memmap views
+    investor_embeddings = investor_embeddings / np.maximum(np.linalg.norm(investor_embeddings, axis=1, keepdims=True), 1e-12)
+    hypothesis_embeddings = hypothesis_embeddings / np.maximum(np.linalg.norm(hypothesis_embeddings, axis=1, keepdims=True), 1e-12)
+    similarities = investor_embeddings @ hypothesis_embeddings.T
+
+    keep = np.zeros_like(similarities, dtype=bool)
+    if top_k is not None:
+        top = np.argsort(-similarities, axis=0)[:top_k]
+        keep[top, np.arange(len(hypotheses))] = True
+    if threshold is not None:
+        keep |= similarities >= threshold
+    pairs = [(int(i), int(h)) for i, h in zip(*np.nonzero(keep))]
+    return pairs, similarities
+
+
+def prefilter_recall(investors_scored, hypotheses, top_n=10, top_k=None, threshold=None):
+    """Share of each hypothesis' top_n investors (by LLM mean_score in a full run) kept by the prefilter"""
+    tensor = as_score_tensor(investors_scored, hypotheses)
+    pairs, _ = prefilter_pairs(tensor.investors, tensor.hypotheses, top_k, threshold)
+    kept = np.zeros(tensor.shape[:2], dtype=bool)
+    for i, h in pairs:
+        kept[i, h] = True
+
+    means = tensor.mean_scores()
+    recall = {}
+    for h, hyp in enumerate(tensor.hypotheses):
+        scored = np.flatnonzero(~np.isnan(means[:, h]))
+        best = scored[np.argsort(-means[scored, h], kind="stable")[:top_n]]
+        if best.size:
+            recall[hyp['hyp_id']] = float(kept[best, h].mean())
+    print(f"Prefilter kept {len(pairs)} of {kept.size} pairs")
+    for hyp_id, value in recall.items():
+        print(f"  hypothesis {hyp_id}: recall@{top_n} = {value:.2f}")
+    return recall
+
+
+def sample_investors(investors_list, num_investors, seed=""):
+    """The num_investors investors with the lowest content hash (salted with seed), in list order.
+
+    The same list always gives the same sample, and adding or removing a few
+    investors only changes the sample where they fall, so repeated runs keep
+    hitting the score cache. Pass a different seed for a different sample.
+    """
+    if num_investors >= len(investors_list):
+        return list(investors_list)
+    ranks = [hashlib.sha256((seed + investor_digest(investor)).encode("utf-8")).hexdigest() for investor in investors_list]
+    keep = set(sorted(range(len(investors_list)), key=ranks.__getitem__)[:num_investors])
+    return [investor for k, investor in enumerate(investors_list) if k in keep]
 
 
 def score_persons(
     investors_list: list[dict[str, str]],
     hypotheses: list[dict[str, str]],
     num_investors: int = 100,
-):
-    investors_list = random.sample(investors_list, min(num_investors, len(investors_list)))
+    prefilter_top_k: int | None = None,
+    prefilter_threshold: float | None = None,
+    batch: bool = False,
+    batch_client=None,
+    group_hypotheses: bool = False,
+    run_id: str | None = None,
+    on_pair=None,
+    tiered: bool = False,
+    latency_target: float = LATENCY_TARGET,
+    stop: threading.Event | None = None,
+    sample_seed: str = "",
+) -> ScoreTensor:
+    """Score a sample of investors against every hypothesis (or the prefiltered pairs).
+
+    Every completed pair is appended to the run journal runs/<run_id>.jsonl
+    as soon as it is scored; pass the run id to resume() after an interruption.
+    on_pair(investor, hypothesis, parsed) is called for each completed pair.
+    tiered scores with score_pairs_tiered (cheap model first, then escalation).
+    latency_target (seconds) is the call latency above which the engine lowers its concurrency.
+    Setting stop makes the engine skip every pair that has not started yet.
+    The investor sample is deterministic (see sample_investors), so re-running
+    a campaign after a hypothesis tweak scores the same investors.
+    """
+    investors_list = sample_investors(investors_list, num_investors, sample_seed)
     inv_id = 0
     for inv in investors_list:
         inv['id'] = inv_id
@@ -114,96 +525,240 @@ def score_persons(
     for hyp in hypotheses:
         hyp['hyp_id'] = hyp_id
         hyp_id += 1
-    args = [(deepcopy(investor), hypothesis) for investor, hypothesis in product(investors_list, hypotheses)]
+    if prefilter_top_k is not None or prefilter_threshold is not None:
+        # Cascade: only pairs that pass the embedding prefilter go to the LLM
+        pairs, _ = prefilter_pairs(investors_list, hypotheses, prefilter_top_k, prefilter_threshold)
+        print(f"Prefilter kept {len(pairs)} of {len(investors_list) * len(hypotheses)} pairs "
+              f"(check its recall with prefilter_recall / --measure-recall)")
+    else:
+        pairs = [(i, h) for i in range(len(investors_list)) for h in range(len(hypotheses))]
+    journal = RunJournal.create(investors_list, hypotheses, pairs, run_id)
+    return score_journal_pairs(journal, pairs, batch, batch_client, group_hypotheses, on_pair, tiered,
+                               {"latency_target": latency_target, "stop": stop})
+
+
+def score_journal_pairs(journal, pairs, batch=False, batch_client=None, group_hypotheses=False, on_pair=None,
+                        tiered=False, engine_options=None):
+    """Score (investor index, hypothesis index) pairs of a run, journaling each one as it completes"""
+    tensor = journal.tensor()
+    # Pairs share the investor and hypothesis dicts; results land in the tensor, not in copies
+    args = [(journal.investors[i], journal.hypotheses[h]) for i, h in pairs]
     print(f"Processing {len(args)} arguments")
-    return score_person.batch(args, {'max_concurrency': 5000})
+
+    def on_result(k, parsed):
+        i, h = pairs[k]
+        journal.record(i, h, parsed)
+        tensor.set(i, h, parsed)
+        if on_pair:
+            on_pair(journal.investors[i], journal.hypotheses[h], parsed)
+
+    if batch:
+        score_pairs_batch(args, batch_client, on_result=on_result)
+    elif group_hypotheses:
+        score_pairs_grouped(args, on_result, engine_options)
+    elif tiered:
+        score_pairs_tiered(args, on_result, engine_options=engine_options)
+    else:
+        score_pairs(args, on_result, engine_options=engine_options)
+    return tensor
+
+
+def resume(run_id: str, batch: bool = False, batch_client=None, group_hypotheses: bool = False, on_pair=None,
+           tiered: bool = False, latency_target: float = LATENCY_TARGET, stop: threading.Event | None = None) -> ScoreTensor:
+    """Finish an interrupted run: only pairs missing from its journal are scored.
+
+    on_pair sees the pairs already in the journal first, then the new ones.
+    """
+    journal = RunJournal.load(run_id)
+    if on_pair:
+        for (i, h), parsed in journal.completed.items():
+            on_pair(journal.investors[i], journal.hypotheses[h], parsed)
+    return score_journal_pairs(journal, journal.pending_pairs(), batch, batch_client, group_hypotheses, on_pair, tiered,
+                               {"latency_target": latency_target, "stop": stop})
+
+
+class Leaderboard:
+    """Running top_n investors per hypothesis by mean score"""
+
+    def __init__(self, top_n=10):
+        self.top_n = top_n
+        self._heaps = {}
+        self._counter = count()
+
+    def add(self, investor, hypothesis, mean_score):
+        # Min-heap of the best top_n so far; the counter breaks ties without comparing dicts
+        heap = self._heaps.setdefault(hypothesis['hyp_id'], [])
+        entry = (mean_score, next(self._counter), investor)
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def top(self, hyp_id):
+        """[(investor, mean_score)] best first"""
+        return [(investor, mean_score) for mean_score, _, investor in sorted(self._heaps.get(hyp_id, []), reverse=True)]
+
+
+def stream_persons(investors_list, hypotheses, top_n=10, **score_kwargs):
+    """score_persons as a generator: yields (investor, hypothesis, parsed, leaderboard) as pairs complete.
+
+    Scoring runs on a background thread; pairs arrive in completion order, so
+    the strongest leads show up without waiting for the slowest call. An
+    existing run_id is resumed, replaying its journaled pairs first. Closing
+    or dropping the generator stops the worker from starting any more pairs;
+    pairs it already paid for stay in the journal for a later resume.
+    """
+    completed = queue.Queue()
+    finished = object()
+    stop = threading.Event()
+    run_id = score_kwargs.get("run_id")
+
+    def on_pair(investor, hypothesis, parsed):
+        if not stop.is_set():
+            completed.put((investor, hypothesis, parsed))
+
+    def worker():
+        try:
+            if run_id is not None and RunJournal.exists(run_id):
+                resume(run_id, score_kwargs.get("batch", False), score_kwargs.get("batch_client"),
+                       score_kwargs.get("group_hypotheses", False), on_pair, score_kwargs.get("tiered", False),
+                       score_kwargs.get("latency_target", LATENCY_TARGET), stop)
+            else:
+                score_persons(investors_list, hypotheses, on_pair=on_pair, stop=stop, **score_kwargs)
+        except Exception as exc:
+            completed.put(exc)
+        finally:
+            completed.put(finished)
+
+    threading.Thread(target=worker, daemon=True).start()
+    leaderboard = Leaderboard(top_n)
+    try:
+        while (item := completed.get()) is not finished:
+            if isinstance(item, Exception):
+                raise item
+            investor, hypothesis, parsed = item
+            leaderboard.add(investor, hypothesis, parsed['mean_score'])
+            yield investor, hypothesis, parsed, leaderboard
+    finally:
+        stop.set()
+
+
+def process_run(run_id: str, **kwargs):
+    """Assignment from whatever a (possibly unfinished) run has scored so far"""
+    journal = RunJournal.load(run_id)
+    return process_investors_scored(journal.tensor(), journal.hypotheses, **kwargs)
 
 
 def collapse_investors_scored(investors_scored):
+    """One dict per scored investor with its scores_per_hypothesis, read off the ScoreTensor"""
+    tensor = as_score_tensor(investors_scored)
+    scored = tensor.scored()
+    means = tensor.mean_scores()
     investors_scored_collapsed = []
-    idx_of_investor = {}
-    
-    for investor in investors_scored:
-        inv_id = investor['id']
-        hyp_id = investor['hyp_id']
-        
-        if inv_id not in idx_of_investor:
-            idx_of_investor[inv_id] = len(investors_scored_collapsed)
-            investors_scored_collapsed.append({
-                'id': inv_id,
-                'name': investor['name'],
-                'current location': investor['current location'],
-                'description': investor['description'],
-                'website': investor['website'],
-                'other links': investor['other links'],
-                'current firm name': investor['current firm name'],
-                'firm url': investor['firm url'],
-                'firm description': investor['firm description'],
-                'firm investment': investor['firm investment'],
-                'scores_per_hypothesis': {}
-            })
-        
-        investors_scored_collapsed[idx_of_investor[inv_id]]['scores_per_hypothesis'][hyp_id] = {
-            'scratchpad': investor['scratchpad'],
-            'scores': investor['scores'],
-            'mean_score': investor['mean_score'],
-            'hypothesis': investor['hypothesis'],
-            'pain_point': investor['pain_point'],
-            'pitch': investor['pitch']
-        }
-    
+
+    for i in np.flatnonzero(scored.any(axis=1)):
+        investor = tensor.investors[i]
+        scores_per_hypothesis = {}
+        for h in np.flatnonzero(scored[i]):
+            hyp = tensor.hypotheses[h]
+            scores_per_hypothesis[hyp['hyp_id']] = {
+                'scratchpad': tensor.scratchpad(i, h),
+                'scores': tensor.pair_scores(i, h),
+                'mean_score': float(means[i, h]),
+                'tier': int(tensor.tiers[i, h]),
+                'hypothesis': hyp['hypothesis'],
+                'pain_point': hyp['pain_point'],
+                'pitch': hyp['pitch']
+            }
+        investors_scored_collapsed.append({
+            'id': investor['id'],
+            'name': investor['name'],
+            'current location': investor['current location'],
+            'description': investor['description'],
+            'website': investor['website'],
+            'other links': parse_python_literal(investor['other links']),
+            'current firm name': investor['current firm name'],
+            'firm url': investor['firm url'],
+            'firm description': investor['firm description'],
+            'firm investment': firm_investment(investor),
+            'scores_per_hypothesis': scores_per_hypothesis
+        })
+
     return investors_scored_collapsed
 
 
-def process_investors_scored(investors_scored, hypotheses, max_investors_per_hypothesis=None):
+def process_investors_scored(investors_scored, hypotheses, max_investors_per_hypothesis=None, capacities=None, method="auto"):
+    """Collapse scored pairs per investor and assign each investor at most one hypothesis.
+
+    investors_scored is the ScoreTensor from score_persons (the old list of
+    pair dicts is still accepted). capacities ({hyp_id: max investors})
+    overrides the uniform max_investors_per_hypothesis. The assignment
+    maximises the total mean score (see assignment.assign); method="greedy"
+    keeps the old heuristic.
+    """
+    tensor = as_score_tensor(investors_scored, hypotheses)
     if max_investors_per_hypothesis is None:
-        max_investors_per_hypothesis = len(investors_scored) // len(hypotheses)
-    # Collapse the investors scored
-    investors_scored_collapsed = collapse_investors_scored(investors_scored)
-
-    # Create a dictionary to track the number of investors assigned to each hypothesis
-    hypothesis_capacity = {hyp['hyp_id']: 0 for hyp in hypotheses}
-
-    # Sort investors based on their highest mean score for any hypothesis
-    sorted_investors = sorted(investors_scored_collapsed, key=lambda inv: max(inv['scores_per_hypothesis'].values(), key=lambda x: x['mean_score'])['mean_score'], reverse=True)
-
-    # Assign each investor to the hypothesis with the highest mean score that hasn't reached its capacity
-    for inv in sorted_investors:
-        best_hypothesis = None
-        best_score = -float('inf')
-        for hyp_id, scores in inv['scores_per_hypothesis'].items():
-            if hypothesis_capacity[hyp_id] < max_investors_per_hypothesis and scores['mean_score'] > best_score:
-                best_hypothesis = hyp_id
-                best_score = scores['mean_score']
-        
-        if best_hypothesis is not None:
-            best_hyp = inv['scores_per_hypothesis'][best_hypothesis]
-            hypothesis_capacity[best_hypothesis] += 1
+        max_investors_per_hypothesis = int(tensor.scored().sum()) // len(tensor.hypotheses)
+
+    hyp_ids = [hyp['hyp_id'] for hyp in tensor.hypotheses]
+    assignment, _ = assign(tensor.mean_scores(), capacity_array(hyp_ids, capacities or max_investors_per_hypothesis), method)
+
+    investors_scored_collapsed = collapse_investors_scored(tensor)
+    rows = np.flatnonzero(tensor.scored().any(axis=1))
+    for inv, column in zip(investors_scored_collapsed, assignment[rows]):
+        if column >= 0:
+            best_hyp = inv['scores_per_hypothesis'][hyp_ids[column]]
             inv['matched_hypothesis'] = {
                 'hypothesis': best_hyp['hypothesis'],
                 'pain_point': best_hyp['pain_point'],
                 'pitch': best_hyp['pitch'],
-                'hyp_id': best_hyp['hyp_id'],
+                'hyp_id': hyp_ids[column],
             }
 
     return investors_scored_collapsed
 
-def get_aldo_data(hypotheses: list[dict[str, str]]):
-    with open("investors_list_no_score.jsonl", "r", encoding="utf-8") as file:
-        investors_list = [json.loads(line) for line in file]
-    investors_list = random.sample(investors_list, min(100, len(investors_list)))
-    investors_scored = score_persons(investors_list, hypotheses)
+def get_aldo_data(hypotheses: list[dict[str, str]], prefilter_top_k: int | None = None, prefilter_threshold: float | None = None,
+                  batch: bool = False, batch_client=None, group_hypotheses: bool = False, run_id: str | None = None,
+                  tiered: bool = False, latency_target: float = LATENCY_TARGET):
+    """Score and assign investors; an existing run_id is resumed instead of starting over"""
+    if run_id is not None and RunJournal.exists(run_id):
+        investors_scored = resume(run_id, batch=batch, batch_client=batch_client, group_hypotheses=group_hypotheses,
+                                  tiered=tiered, latency_target=latency_target)
+        return process_investors_scored(investors_scored, investors_scored.hypotheses)
+    # Parsed once into the columnar store; later calls only re-hash the source file
+    investors_list = load_investors(INVESTORS_PATH).to_dicts()
+    investors_scored = score_persons(investors_list, hypotheses, prefilter_top_k=prefilter_top_k,
+                                     prefilter_threshold=prefilter_threshold, batch=batch, batch_client=batch_client,
+                                     group_hypotheses=group_hypotheses, run_id=run_id, tiered=tiered,
+                                     latency_target=latency_target)
     assigned_investors = process_investors_scored(investors_scored, hypotheses)
     return assigned_investors
 
 
 if __name__ == "__main__":
-    # Read the JSONL file and output a simple list
-    with open("investors_list_no_score.jsonl", "r", encoding="utf-8") as file:
-        investors_list = [json.loads(line) for line in file]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score investors against hypothesis.jsonl and assign them")
+    parser.add_argument("--run-id", help="Journal the run under this id; an existing run is resumed")
+    parser.add_argument("--prefilter-top-k", type=int, help="Only LLM-score each hypothesis' top k investors by embedding")
+    parser.add_argument("--prefilter-threshold", type=float, help="Only LLM-score pairs with at least this cosine similarity")
+    parser.add_argument("--measure-recall", action="store_true",
+                        help="Score every pair and log how many of the best ones the prefilter settings would keep")
+    cli_args = parser.parse_args()
     with open("hypothesis.jsonl", "r", encoding="utf-8") as file:
         hypothesis = [json.loads(line) for line in file]
-    test = get_aldo_data(hypothesis)
+    if cli_args.measure_recall:
+        if cli_args.prefilter_top_k is None and cli_args.prefilter_threshold is None:
+            parser.error("--measure-recall needs --prefilter-top-k and/or --prefilter-threshold")
+        if cli_args.run_id is not None and RunJournal.exists(cli_args.run_id):
+            investors_scored = resume(cli_args.run_id)
+        else:
+            investors_scored = score_persons(load_investors(INVESTORS_PATH).to_dicts(), hypothesis, run_id=cli_args.run_id)
+        prefilter_recall(investors_scored, investors_scored.hypotheses, top_k=cli_args.prefilter_top_k,
+                         threshold=cli_args.prefilter_threshold)
+    else:
+        test = get_aldo_data(hypothesis, prefilter_top_k=cli_args.prefilter_top_k,
+                             prefilter_threshold=cli_args.prefilter_threshold, run_id=cli_args.run_id)
     # investors_list = random.sample(investors_list, min(100, len(investors_list)))
     # import time
     # start_time = time.time()
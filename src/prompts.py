@@ -25,7 +25,7 @@ Return all the updated customer personas in the same format as the original pers
 
 Output Format:
 [
-  {
+  {{
     "persona_name": "Name",
     "demographics": "Demographics",
     "psychographics": "Psychographics",
@@ -40,7 +40,7 @@ Output Format:
     "influences_and_motivators": "Influences and motivators",
     "goals_and_aspirations": "Goals and aspirations",
     "pitch": "Pitch"
-  }
+  }}
 ]
 Final Notes:
 
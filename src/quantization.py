@@ -0,0 +1,62 @@
+import numpy as np
+
+DTYPES = ('float32', 'float16', 'int8')
+
+
+class ScalarQuantizer:
+    """Compact storage for (normalized) embeddings.
+
+    float16 is a plain cast. int8 is symmetric scalar quantization with one
+    scale per dimension, fitted on a sample of the data: code = round(x / scale).
+    """
+
+    def __init__(self, dtype='float32', scale=None):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}, expected one of {DTYPES}")
+        self.dtype = dtype
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float32)
+
+    def fit(self, vectors):
+        if self.dtype == 'int8':
+            max_abs = np.abs(np.asarray(vectors, dtype=np.float32)).max(axis=0)
+            self.scale = np.maximum(max_abs, 1e-12) / 127.0
+        return self
+
+    def encode(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dtype == 'float32':
+            return vectors
+        if self.dtype == 'float16':
+            return vectors.astype(np.float16)
+        if self.scale is None:
+            self.fit(vectors)
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def decode(self, codes):
+        if self.dtype == 'int8':
+            return codes.astype(np.float32) * self.scale
+        return codes.astype(np.float32, copy=False)
+
+    def score(self, codes, queries, block_size=65536):
+        """Dot products between stored codes and float queries, shape (n_codes, n_queries).
+
+        The int8 scale is folded into the queries, so codes are only widened
+        block by block and never fully dequantized.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.dtype == 'int8':
+            queries = queries * self.scale
+        out = np.empty((len(codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(codes), block_size):
+            block = codes[start:start + block_size].astype(np.float32)
+            out[start:start + block_size] = block @ queries.T
+        return out
+
+    def top_k(self, codes, queries, k=10):
+        """Brute-force (ids, scores) of the k best stored rows for every query"""
+        scores = self.score(codes, queries).T
+        k = min(k, scores.shape[1])
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        return best, np.take_along_axis(scores, best, axis=1)
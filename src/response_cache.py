@@ -0,0 +1,71 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+RESPONSE_CACHE_PATH = "response_cache.sqlite"
+# Cached completions older than this are regenerated
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+# Responses kept in memory in front of the SQLite store
+RESPONSE_CACHE_MEMORY_ENTRIES = 64
+
+
+def response_key(model, messages, **params):
+    """Content hash of a completion request: model, messages and sampling params"""
+    return hashlib.sha256(
+        json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class ResponseCache:
+    """Two-level cache of raw LLM response text: an in-process LRU over a SQLite store, both with a TTL"""
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL, memory_entries=RESPONSE_CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()  # key -> (created, response), most recently used last
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)")
+
+    def _remember(self, key, created, response):
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        oldest = time.time() - self.ttl
+        with self._lock:
+            if key in self._memory:
+                created, response = self._memory[key]
+                if created >= oldest:
+                    self._memory.move_to_end(key)
+                    return response
+                del self._memory[key]
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < oldest:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._remember(key, row[1], row[0])
+            return row[0]
+
+    def put(self, key, response):
+        created = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                (key, response, created),
+            )
+            self._remember(key, created, response)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
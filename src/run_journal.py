@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from src.score_tensor import ScoreTensor
+
+RUNS_DIR = "runs"
+
+
+def new_run_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class RunJournal:
+    """Append-only JSONL log of one scoring run.
+
+    The first line holds the run's investors, hypotheses and the pairs to
+    score; every completed pair is appended as its own line the moment it is
+    scored, so an interrupted run can be resumed or assigned from what it has.
+    """
+
+    def __init__(self, run_id, runs_dir=RUNS_DIR):
+        self.run_id = run_id
+        self.path = os.path.join(runs_dir, f"{run_id}.jsonl")
+        self.investors = []
+        self.hypotheses = []
+        self.pairs = []
+        self.completed = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, investors, hypotheses, pairs, run_id=None, runs_dir=RUNS_DIR):
+        journal = cls(run_id or new_run_id(), runs_dir)
+        journal.investors, journal.hypotheses, journal.pairs = investors, hypotheses, [tuple(pair) for pair in pairs]
+        os.makedirs(runs_dir, exist_ok=True)
+        try:
+            # "x" so an existing run is never truncated; its scored pairs stay resumable
+            f = open(journal.path, "x", encoding="utf-8")
+        except FileExistsError:
+            raise FileExistsError(f"Run {journal.run_id} already exists at {journal.path}; use resume() to continue it") from None
+        with f:
+            f.write(json.dumps({"run_id": journal.run_id, "investors": investors, "hypotheses": hypotheses, "pairs": pairs}) + "\n")
+        print(f"Started run {journal.run_id} ({journal.path})")
+        return journal
+
+    @classmethod
+    def load(cls, run_id, runs_dir=RUNS_DIR):
+        journal = cls(run_id, runs_dir)
+        with open(journal.path, "rb") as f:
+            data = f.read()
+        if not data.endswith(b"\n"):
+            # Interrupted mid-write: drop the torn last line so appends stay line-aligned
+            data = data[:data.rfind(b"\n") + 1]
+            with open(journal.path, "r+b") as f:
+                f.truncate(len(data))
+        lines = data.decode("utf-8").splitlines()
+        header = json.loads(lines[0])
+        journal.investors, journal.hypotheses = header["investors"], header["hypotheses"]
+        journal.pairs = [tuple(pair) for pair in header["pairs"]]
+        for line in lines[1:]:
+            record = json.loads(line)
+            journal.completed[(record["i"], record["h"])] = record["result"]
+        print(f"Loaded run {run_id}: {len(journal.completed)} of {len(journal.pairs)} pairs scored")
+        return journal
+
+    @staticmethod
+    def exists(run_id, runs_dir=RUNS_DIR):
+        return os.path.exists(os.path.join(runs_dir, f"{run_id}.jsonl"))
+
+    def record(self, i, h, parsed):
+        """Append one scored pair and flush it to disk"""
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"i": i, "h": h, "result": parsed}) + "\n")
+            self.completed[(i, h)] = parsed
+
+    def pending_pairs(self):
+        return [pair for pair in self.pairs if pair not in self.completed]
+
+    def tensor(self):
+        """ScoreTensor of everything scored so far"""
+        tensor = ScoreTensor(self.investors, self.hypotheses)
+        for (i, h), parsed in self.completed.items():
+            tensor.set(i, h, parsed)
+        return tensor
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+SCORE_CACHE_PATH = "score_cache.sqlite"
+
+# Keys score_persons adds to each investor; they are not part of its content
+RUN_KEYS = {"id"}
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def investor_digest(investor):
+    """Content hash of an investor, ignoring the keys a run assigns"""
+    return _sha256(json.dumps({k: v for k, v in investor.items() if k not in RUN_KEYS}, sort_keys=True))
+
+
+def score_key(investor, hypothesis, template, model):
+    """Content hash of everything that determines an LLM score for one pair"""
+    return _sha256(json.dumps([
+        investor_digest(investor),
+        [hypothesis["hypothesis"], hypothesis["pain_point"], hypothesis["pitch"]],
+        _sha256(template),
+        model,
+    ]))
+
+
+class ScoreCache:
+    """Durable SQLite cache of parsed LLM scores, safe to share between worker threads"""
+
+    def __init__(self, path=SCORE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM scores WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, result):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scores (key, result, created) VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time()),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
@@ -0,0 +1,123 @@
+import numpy as np
+
+# Rubrics of score_investor_on_hypothesis, in prompt order
+RUBRICS = [
+    "Strategic Fit",
+    "Investment Stage & Range Alignment",
+    "Sector Expertise",
+    "Track Record",
+    "Value-Add Potential",
+    "Decision-Making Authority",
+    "Recent Investment Activity",
+    "Geographical Alignment",
+    "Innovation Appetite",
+    "Potential for Follow-On Investment",
+]
+
+# Keys a scored pair dict adds on top of the investor's own fields
+PAIR_KEYS = {"scratchpad", "scores", "mean_score", "tier", "model", "hypothesis", "pain_point", "pitch", "hyp_id"}
+
+
+class ScoreTensor:
+    """LLM scores for investors x hypotheses x rubrics in one array.
+
+    Each investor and hypothesis is held once; rubric scores live in a float32
+    array with NaN for anything not scored, and scratchpads in a side list
+    referenced by index. `tiers` records which model tier of the tiered
+    scorer produced each score (-1 when untiered). Rows and columns follow the
+    order of `investors` and `hypotheses`.
+    """
+
+    def __init__(self, investors, hypotheses, rubrics=RUBRICS):
+        self.investors = investors
+        self.hypotheses = hypotheses
+        self.rubrics = list(rubrics)
+        self._rubric_column = {rubric: k for k, rubric in enumerate(self.rubrics)}
+        self.scores = np.full((len(investors), len(hypotheses), len(self.rubrics)), np.nan, dtype=np.float32)
+        self.scratchpad_index = np.full((len(investors), len(hypotheses)), -1, dtype=np.int32)
+        self.scratchpads = []
+        self.tiers = np.full((len(investors), len(hypotheses)), -1, dtype=np.int8)
+
+    @property
+    def shape(self):
+        return self.scores.shape
+
+    def _column(self, rubric):
+        if rubric not in self._rubric_column:
+            # The model renamed or added a rubric; give it its own column
+            self._rubric_column[rubric] = len(self.rubrics)
+            self.rubrics.append(rubric)
+            pad = np.full(self.scores.shape[:2] + (1,), np.nan, dtype=np.float32)
+            self.scores = np.concatenate([self.scores, pad], axis=2)
+        return self._rubric_column[rubric]
+
+    def set(self, i, h, parsed):
+        """Store a parse_output result for investor row i and hypothesis column h"""
+        self.scores[i, h] = np.nan
+        for rubric, value in parsed["scores"].items():
+            self.scores[i, h, self._column(rubric)] = value
+        self.tiers[i, h] = parsed.get("tier", -1)
+        self.scratchpad_index[i, h] = len(self.scratchpads)
+        self.scratchpads.append(parsed["scratchpad"])
+
+    def scored(self):
+        """investors x hypotheses mask of pairs that have a score"""
+        return self.scratchpad_index >= 0
+
+    def mean_scores(self):
+        """investors x hypotheses mean rubric score, NaN where the pair was not scored"""
+        scored = self.scored()
+        totals = np.nansum(self.scores, axis=2, dtype=np.float64)
+        counts = np.maximum((~np.isnan(self.scores)).sum(axis=2), 1)
+        return np.where(scored, totals / counts, np.nan)
+
+    def pair_scores(self, i, h):
+        """{rubric: score} for one pair, as parse_output returned it"""
+        return {rubric: _number(self.scores[i, h, k]) for rubric, k in self._rubric_column.items()
+                if not np.isnan(self.scores[i, h, k])}
+
+    def scratchpad(self, i, h):
+        k = self.scratchpad_index[i, h]
+        return self.scratchpads[k] if k >= 0 else None
+
+    def to_scored_list(self):
+        """The old one-dict-per-pair list (investor fields + scores + hypothesis)"""
+        means = self.mean_scores()
+        return [
+            {**self.investors[i], "scratchpad": self.scratchpad(i, h), "scores": self.pair_scores(i, h),
+             "mean_score": float(means[i, h]), "tier": int(self.tiers[i, h]), **self.hypotheses[h]}
+            for i, h in zip(*np.nonzero(self.scored()))
+        ]
+
+    @classmethod
+    def from_scored_list(cls, investors_scored, hypotheses=None):
+        """Build a tensor from the old one-dict-per-pair list; pairs without a score are skipped.
+
+        Without hypotheses, they are recovered from the pairs in hyp_id order.
+        """
+        if hypotheses is None:
+            found = {pair["hyp_id"]: {key: pair[key] for key in ("hypothesis", "pain_point", "pitch", "hyp_id")}
+                     for pair in investors_scored if "hyp_id" in pair}
+            hypotheses = [found[hyp_id] for hyp_id in sorted(found)]
+        column = {hyp["hyp_id"]: h for h, hyp in enumerate(hypotheses)}
+        row, investors = {}, []
+        for pair in investors_scored:
+            if pair["id"] not in row:
+                row[pair["id"]] = len(investors)
+                investors.append({k: v for k, v in pair.items() if k not in PAIR_KEYS})
+        tensor = cls(investors, hypotheses)
+        for pair in investors_scored:
+            if "scores" in pair and pair.get("hyp_id") in column:
+                tensor.set(row[pair["id"]], column[pair["hyp_id"]], pair)
+        return tensor
+
+
+def as_score_tensor(investors_scored, hypotheses=None):
+    """Pass a ScoreTensor through, convert the old list of scored pair dicts"""
+    if isinstance(investors_scored, ScoreTensor):
+        return investors_scored
+    return ScoreTensor.from_scored_list(investors_scored, hypotheses)
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else float(value)
@@ -0,0 +1,229 @@
+import asyncio
+import random
+import threading
+import time
+
+# Seconds; slower successful calls trim the concurrency limit (o1-mini usually answers well within this)
+LATENCY_TARGET = 60.0
+
+
+def is_rate_limit(exc):
+    """True for HTTP 429 style errors from the OpenAI SDK / LangChain"""
+    return getattr(exc, "status_code", None) == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def retry_after(exc):
+    """Seconds the provider asked us to wait, if it said so"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute; acquire() waits until enough are available.
+
+    Thread-safe, so one bucket can be shared by runs on different event loops.
+    Callers reserve their amount up front and sleep off any debt, which keeps
+    the order fair without holding a lock while waiting.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1.0):
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold back every acquire() that has not reserved yet for at least `seconds`"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit: +1 per window of successes, halved on 429s, trimmed on slow responses"""
+
+    def __init__(self, initial=8, minimum=1, maximum=64, latency_target=LATENCY_TARGET, cooldown=5.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _decrease(self, factor):
+        # Many requests fail at once during a burst; only back off once per cooldown
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.minimum, self.limit * factor)
+            self._last_decrease = now
+
+    def on_success(self, latency):
+        if self.latency_target is not None and latency > self.latency_target:
+            self._decrease(0.9)
+        else:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_rate_limit(self):
+        self._decrease(0.5)
+
+
+class RetryBudget:
+    """One retry allowance shared by the whole run instead of per request"""
+
+    def __init__(self, total):
+        self.remaining = total
+
+    def consume(self):
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class EngineRun:
+    """State of one ScoringEngine.run: its concurrency limit, retry budget and counters"""
+
+    def __init__(self, concurrency, retry_budget):
+        self.concurrency = concurrency
+        self.retry_budget = retry_budget
+        self.stats = {"succeeded": 0, "failed": 0, "errors": 0, "retries": 0, "rate_limited": 0, "stopped": 0}
+
+
+class ScoringEngine:
+    """Runs many LLM calls under request/token rate limits with adaptive concurrency.
+
+    call(item) is an async function doing exactly one attempt. Failures are
+    retried with jittered exponential backoff while both the per-item attempt
+    cap and the run-wide retry budget allow it. A 429 is not counted as a
+    failure: it pauses the request bucket (for retry-after, or an exponential
+    backoff) and the item waits its turn there, up to max_rate_limit_retries
+    times. The rate limit buckets belong to the engine and are shared by all
+    its runs, including concurrent ones; everything else is per run.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=500,
+        tokens_per_minute=200_000,
+        initial_concurrency=8,
+        max_concurrency=64,
+        max_attempts=4,
+        max_rate_limit_retries=20,
+        retry_budget_ratio=0.2,
+        min_retry_budget=10,
+        latency_target=LATENCY_TARGET,
+        backoff_base=1.0,
+        backoff_cap=60.0,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.retry_budget_ratio = retry_budget_ratio
+        self.min_retry_budget = min_retry_budget
+        self.latency_target = latency_target
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    async def _run_one(self, run, item, call, estimate_tokens, on_failure, stop):
+        attempt = rate_limited = 0
+        while True:
+            await run.concurrency.acquire()
+            if stop is not None and stop.is_set():
+                # The caller went away: skip what has not started, in-flight calls still finish
+                await run.concurrency.release()
+                run.stats["stopped"] += 1
+                return None
+            try:
+                await self.request_bucket.acquire(1)
+                if estimate_tokens:
+                    await self.token_bucket.acquire(estimate_tokens(item))
+                start = time.monotonic()
+                result = await call(item)
+            except Exception as exc:
+                if is_rate_limit(exc):
+                    run.stats["rate_limited"] += 1
+                    run.concurrency.on_rate_limit()
+                else:
+                    run.stats["errors"] += 1
+                last_exc = exc
+            else:
+                run.concurrency.on_success(time.monotonic() - start)
+                run.stats["succeeded"] += 1
+                return result
+            finally:
+                await run.concurrency.release()
+
+            if is_rate_limit(last_exc):
+                # The provider is saturated, not failing this item: wait on the limiter, keep the retry budget
+                rate_limited += 1
+                if rate_limited > self.max_rate_limit_retries:
+                    break
+                self.request_bucket.pause(retry_after(last_exc) or min(self.backoff_cap, self.backoff_base * 2 ** (rate_limited - 1)))
+                continue
+
+            attempt += 1
+            if attempt == self.max_attempts or not run.retry_budget.consume():
+                break
+            run.stats["retries"] += 1
+            # Full jitter, but never sooner than the provider asked for
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+            await asyncio.sleep(max(delay, retry_after(last_exc) or 0))
+
+        run.stats["failed"] += 1
+        print(f"Giving up on item after {attempt} errors and {rate_limited} rate limits: {last_exc!r}")
+        return on_failure(item, last_exc) if on_failure else None
+
+    async def run(self, items, call, estimate_tokens=None, on_failure=None, latency_target=None, stop=None):
+        """Results of call(item) in input order; on_failure(item, exc) fills failed slots.
+
+        latency_target overrides the engine's for this run. Once the threading.Event
+        stop is set, items that have not started are skipped and come back as None.
+        """
+        items = list(items)
+        concurrency = AdaptiveConcurrency(self.initial_concurrency, maximum=self.max_concurrency,
+                                          latency_target=latency_target or self.latency_target)
+        retry_budget = RetryBudget(max(self.min_retry_budget, int(self.retry_budget_ratio * len(items))))
+        run = EngineRun(concurrency, retry_budget)
+
+        results = await asyncio.gather(*(self._run_one(run, item, call, estimate_tokens, on_failure, stop) for item in items))
+        run.stats["final_concurrency"] = round(concurrency.limit, 1)
+        print(f"Scoring engine stats: {run.stats}")
+        return results
+
+    def run_sync(self, items, call, estimate_tokens=None, on_failure=None, latency_target=None, stop=None):
+        return asyncio.run(self.run(items, call, estimate_tokens, on_failure, latency_target, stop))
@@ -0,0 +1,68 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Per-worker model, loaded once by the pool initializer
+_worker_model = None
+
+
+def _init_worker(model_name, threads_per_worker):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # Keep workers from oversubscribing the cores between them
+    torch.set_num_threads(threads_per_worker)
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_shard(args):
+    shard_no, texts, batch_size = args
+    return shard_no, _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+
+class ShardedEncoder:
+    """Encode texts across a pool of CPU worker processes, one model copy each.
+
+    Texts are cut into contiguous shards, encoded in parallel and stitched back
+    together by shard number, so the output order always matches the input.
+    """
+
+    def __init__(self, model_name, workers=None, batch_size=32):
+        self.model_name = model_name
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        threads_per_worker = max(1, (os.cpu_count() or 1) // self.workers)
+        # spawn, not fork: forking a process that already imported torch can deadlock
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, threads_per_worker),
+        )
+
+    def encode(self, texts, batch_size=None, shard_size=None):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        batch_size = batch_size or self.batch_size
+        if shard_size is None:
+            # A few shards per worker evens out rows of different lengths
+            shard_size = max(batch_size, math.ceil(len(texts) / (self.workers * 4)))
+
+        shards = [(n, texts[start:start + shard_size], batch_size)
+                  for n, start in enumerate(range(0, len(texts), shard_size))]
+        results = dict(self._pool.map(_encode_shard, shards))
+        return np.concatenate([results[n] for n in range(len(shards))])
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
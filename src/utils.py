@@ -1,5 +1,6 @@
 import re
 import ast
+import json
 
 def parse_llm_response(response):
     match = re.findall(r"```json(.*?)```", response, re.DOTALL)
@@ -9,4 +10,120 @@ def parse_llm_response(response):
         response = ast.literal_eval(match[0])
     except:
         response = None
-    return response
\ No newline at end of file
+    return response
+
+
+def parse_literal(text):
+    """JSON first, then a Python literal (what parse_llm_response accepts); None if neither parses"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except:
+        return None
+
+
+class PersonaStreamParser:
+    """Incremental parser for a streamed persona list.
+
+    feed() it chunks as they arrive; it skips the <thinking> section, finds
+    the persona array (the first "[{", after the ```json fence when there is
+    one, so bracketed prose before it is ignored) and returns every persona
+    object whose closing brace arrived in that chunk. A malformed or truncated
+    persona is dropped on its own, so a broken tail only loses the last one;
+    `complete` tells whether the array was closed.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.personas = []
+        self._pos = 0
+        self._in_array = False
+        self.complete = False
+        self._depth = 0
+        self._quote = None
+        self._escaped = False
+        self._start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        if self.complete:
+            return []
+        if not self._in_array:
+            self._find_array()
+        return self._scan() if self._in_array else []
+
+    def _find_array(self):
+        while True:
+            rest = self.text[self._pos:]
+            thinking = rest.find("<thinking>")
+            bracket = rest.find("[")
+            fence = rest.find("```json")
+            if thinking >= 0 and (bracket < 0 or thinking < bracket):
+                end = rest.find("</thinking>", thinking)
+                if end < 0:
+                    # Wait for the reasoning to close; it may contain brackets of its own
+                    self._pos += thinking
+                    return
+                self._pos += end + len("</thinking>")
+            elif fence >= 0 and (bracket < 0 or fence < bracket):
+                # The array is the first bracket inside the fence
+                self._pos += fence + len("```json")
+            elif bracket >= 0:
+                after = rest[bracket + 1:].lstrip()
+                if not after:
+                    # Wait for the next character to tell whether it opens a list of objects
+                    self._pos += bracket
+                    return
+                if after[0] != "{":
+                    # Prose like "[5 total]" before the fenced array
+                    self._pos += bracket + 1
+                    continue
+                self._pos += bracket
+                self._in_array = True
+                return
+            else:
+                # Keep enough of the tail to catch a tag split across chunks
+                self._pos = max(self._pos, len(self.text) - len("<thinking>"))
+                return
+
+    def _scan(self):
+        found = []
+        for k in range(self._pos, len(self.text)):
+            ch = self.text[k]
+            if self._quote:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == self._quote:
+                    self._quote = None
+            elif ch in "\"'":
+                self._quote = ch
+            elif ch in "[{":
+                self._depth += 1
+                if ch == "{" and self._depth == 2:
+                    self._start = k
+            elif ch in "]}":
+                if ch == "}" and self._depth == 2 and self._start is not None:
+                    persona = parse_literal(self.text[self._start:k + 1])
+                    if isinstance(persona, dict):
+                        self.personas.append(persona)
+                        found.append(persona)
+                    else:
+                        print(f"Skipping malformed persona {len(self.personas) + 1}")
+                    self._start = None
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                    break
+        self._pos = len(self.text)
+        return found
+
+    def result(self):
+        """The personas parsed so far, falling back to parse_llm_response when the stream had none"""
+        if self.personas:
+            return self.personas
+        return parse_llm_response(self.text)
@@ -0,0 +1,26 @@
+import asyncio
+import json
+
+from src import hypothesis_generator
+
+
+def test_ui_follows_the_hedge_when_the_first_request_fails(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    broken = '[{"persona_name": "A"}, {"persona_name": "B"}, {"persona_na'
+    valid = json.dumps([{"persona_name": name} for name in ("X", "Y", "Z")])
+    responses = iter([(broken, 0.0), (valid, 0.05)])
+
+    async def astream_completion(messages, **kwargs):
+        text, delay = next(responses)
+        for k in range(0, len(text), 8):
+            await asyncio.sleep(delay)
+            yield text[k:k + 8]
+
+    monkeypatch.setattr(hypothesis_generator.openai_api, "astream_completion", astream_completion)
+    shown = []
+    personas = hypothesis_generator.hedged_personas(
+        [{"role": "user", "content": "personas"}], on_persona=lambda p: shown.append(p["persona_name"]),
+        force=True, max_candidates=2, hedge_after=0, on_restart=shown.clear)
+
+    assert [p["persona_name"] for p in personas] == ["X", "Y", "Z"]
+    assert shown == ["X", "Y", "Z"]
@@ -0,0 +1,23 @@
+import json
+
+from src import hypothesis_generator
+
+
+def test_chat_update_streams_rewritten_personas(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    hypothesis = [{"persona_name": "Platform lead", "pain_points": "slow CI"}]
+    conversation = [{"role": "user", "content": "Make the persona a CTO"}]
+    messages = hypothesis_generator.update_messages({"company_name": "Acme"}, hypothesis, conversation,
+                                                    "Make the persona a CTO")
+    prompt = messages[0]["content"]
+    assert json.dumps(hypothesis) in prompt and '"persona_name": "Name"' in prompt
+
+    response = '<thinking>rename</thinking>[{"persona_name": "CTO", "pitch": "ship"}, {"persona_name": "VP Eng", "pitch": "scale"}]'
+    chunks = [response[k:k + 7] for k in range(0, len(response), 7)]
+    monkeypatch.setattr(hypothesis_generator.openai_api, "stream_completion", lambda messages, **kwargs: iter(chunks))
+    streamed, texts = [], []
+    parser = hypothesis_generator.stream_personas(messages, on_persona=streamed.append, on_text=texts.append, force=True)
+
+    assert [persona["persona_name"] for persona in streamed] == ["CTO", "VP Eng"]
+    assert len(texts) == len(chunks)
+    assert parser.result() == streamed
@@ -0,0 +1,21 @@
+import pytest
+
+from src.utils import PersonaStreamParser
+
+PERSONAS = '[{"persona_name": "CTO", "needs": ["speed"]}, {"persona_name": "VP Eng", "needs": []}]'
+
+
+@pytest.mark.parametrize("response", [
+    "<thinking>try [a, b] first</thinking>" + PERSONAS,
+    "Here are the personas [5 total]:\n```json\n" + PERSONAS + "\n```",
+    "<thinking>ok</thinking>\n```json\n" + PERSONAS + "\n```",
+])
+@pytest.mark.parametrize("chunk_size", [1, 5, 1000])
+def test_personas_stream_before_the_response_ends(response, chunk_size):
+    parser = PersonaStreamParser()
+    streamed = []
+    for k in range(0, len(response), chunk_size):
+        streamed.extend(parser.feed(response[k:k + chunk_size]))
+
+    assert [persona["persona_name"] for persona in streamed] == ["CTO", "VP Eng"]
+    assert parser.complete
@@ -0,0 +1,24 @@
+import numpy as np
+
+import similarity
+from src.process_investor_list import prefilter_pairs
+
+
+class FakeModel:
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        return np.array([[len(text), text.count("a") + 1.0, 1.0] for text in texts], dtype=np.float32)
+
+
+def test_prefilter_pairs_on_cold_and_warm_cache(tmp_path, monkeypatch):
+    # Real EmbeddingCache in a scratch dir, so warm runs return read-only memmap views
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(similarity, "_caches", {})
+    monkeypatch.setattr(similarity, "get_model", lambda model_name=similarity.MODEL_NAME: FakeModel())
+    investors = [{"name": f"Investor {k}", "description": "a" * k} for k in range(6)]
+    hypotheses = [{"hypothesis": "devtools", "pain_point": "slow builds", "pitch": "aaa"}]
+
+    for _ in range(2):
+        pairs, similarities = prefilter_pairs(investors, hypotheses, top_k=3)
+        assert len(pairs) == 3
+        assert similarities.shape == (6, 1)
+        assert np.all(similarities <= 1.0 + 1e-6)
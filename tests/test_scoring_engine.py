@@ -0,0 +1,29 @@
+import asyncio
+
+from src.scoring_engine import ScoringEngine
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after):
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)}})()
+
+
+def test_rate_limits_do_not_spend_the_retry_budget():
+    # Provider that 429s whenever more than 10 requests are in flight
+    in_flight = 0
+
+    async def call(item):
+        nonlocal in_flight
+        in_flight += 1
+        try:
+            if in_flight > 10:
+                raise RateLimitError(0.05)
+            await asyncio.sleep(0.01)
+            return item
+        finally:
+            in_flight -= 1
+
+    engine = ScoringEngine(requests_per_minute=100_000, initial_concurrency=40)
+    results = engine.run_sync(range(300), call)
+
+    assert results == list(range(300))